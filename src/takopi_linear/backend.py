@@ -1,13 +1,18 @@
 from __future__ import annotations
 
+import functools
 import json
 import re
 import shutil
+import sys
+from collections.abc import MutableMapping
+from contextlib import nullcontext
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, cast
 
 import anyio
+from anyio.abc import TaskGroup
 
 from takopi.backends import EngineBackend, SetupIssue
 from takopi.backends_helpers import install_issue
@@ -24,6 +29,8 @@ from takopi.transports import SetupResult, TransportBackend
 from takopi.utils.paths import reset_run_base_dir, set_run_base_dir
 
 from .bridge import LinearPresenter, LinearTransport
+from . import jsonutil
+from .cache import TTLCache
 from .client import LinearApiError, LinearClient
 from .poller import GatewayPoller
 from .settings import LinearTransportSettings
@@ -31,12 +38,26 @@ from .types import GatewayEvent, PlanStep
 
 logger = get_logger(__name__)
 
-_STOP_SESSION_EVENTS: set[str] = {
-    "agent_session.canceled",
-    "agent_session.cancelled",
-    "agent_session.stopped",
+# Shared by the status messages sent straight to LinearTransport, which only reads
+# extra; presenter output goes through takopi and keeps its own dict. Nothing waits
+# on their activity ids, so they go through the client's send queue.
+_THOUGHT_EXTRA: dict[str, Any] = {
+    "activity_type": "thought",
+    "ephemeral": True,
+    "async_mode": True,
 }
 
+_STOP_SESSION_EVENTS: frozenset[str] = frozenset(
+    {
+        "agent_session.canceled",
+        "agent_session.cancelled",
+        "agent_session.stopped",
+    }
+)
+_HANDLED_EVENTS: frozenset[str] = frozenset(
+    {"agent_session.created", "agent_session.prompted", *_STOP_SESSION_EVENTS}
+)
+
 
 def _expect_settings(transport_config: object) -> LinearTransportSettings:
     if isinstance(transport_config, LinearTransportSettings):
@@ -70,10 +91,40 @@ def _resolve_takopi_config_path() -> Path:
     return Path.home() / ".takopi" / "takopi.toml"
 
 
+def _mtime_ns(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _read_config(config_path: Path) -> dict[str, Any]:
+    """``read_config`` memoized on the file's mtime; raises ``ConfigError`` like it.
+
+    The returned dict is shared between callers and must not be mutated.
+    """
+    return _read_config_at(str(config_path), _mtime_ns(config_path))
+
+
+@functools.lru_cache(maxsize=4)
+def _read_config_at(path: str, mtime_ns: int) -> dict[str, Any]:
+    _ = mtime_ns  # cache key only
+    return read_config(Path(path))
+
+
 def _load_linear_project_map(config_path: Path) -> dict[str, str]:
-    """Return a mapping of Linear project id -> takopi project key (lowercase)."""
+    """Return a mapping of Linear project id -> takopi project key (lowercase).
+
+    Results are memoized on the config file's mtime, so repeated loads are free
+    and edits to the config are picked up automatically.
+    """
+    return dict(_load_linear_project_map_cached(str(config_path), _mtime_ns(config_path)))
+
+
+@functools.lru_cache(maxsize=8)
+def _load_linear_project_map_cached(path: str, mtime_ns: int) -> dict[str, str]:
     try:
-        raw = read_config(config_path)
+        raw = _read_config_at(path, mtime_ns)
     except ConfigError:
         return {}
     mapping: dict[str, str] = {}
@@ -85,7 +136,7 @@ def _load_linear_project_map(config_path: Path) -> dict[str, str]:
                 continue
             pid = cfg.get("linear_project_id")
             if isinstance(pid, str) and pid.strip():
-                mapping[pid.strip()] = alias.strip().lower()
+                mapping[sys.intern(pid.strip())] = alias.strip().lower()
 
     plugins = raw.get("plugins")
     if isinstance(plugins, dict):
@@ -97,177 +148,176 @@ def _load_linear_project_map(config_path: Path) -> dict[str, str]:
                     if not isinstance(pid, str) or not isinstance(alias, str):
                         continue
                     if pid.strip() and alias.strip():
-                        mapping[pid.strip()] = alias.strip().lower()
+                        mapping[sys.intern(pid.strip())] = alias.strip().lower()
 
     return mapping
 
 
-def _unwrap_payload(payload: dict[str, Any]) -> dict[str, Any]:
-    """Normalize kai-gateway / Linear webhook payload wrappers.
-
-    Linear webhooks often wrap the event data under a top-level ``data`` key.
-    kai-gateway may also wrap the original webhook body under ``payload``.
-    Some kai-gateway deployments also preserve the full original webhook under
-    ``raw_payload``; we merge it in as a low-priority source of additional
-    fields (without overriding normalized keys).
+def _merge_wrappers(out: dict[str, Any]) -> dict[str, Any]:
+    """Flatten nested ``payload`` / ``data`` wrappers into ``out`` in place.
 
-    We merge nested dict wrappers into a single dict so downstream extractors
-    can consistently look for ``agentSession`` / ``agentActivity`` fields.
+    Inner keys win over outer keys, matching how the wrappers are layered.
     """
 
-    out: dict[str, Any] = dict(payload or {})
     for _ in range(6):
         inner_payload = out.get("payload")
         if isinstance(inner_payload, dict):
-            merged = dict(out)
-            merged.pop("payload", None)
-            merged.update(inner_payload)
-            out = merged
+            del out["payload"]
+            out.update(inner_payload)
             continue
 
         data = out.get("data")
         if isinstance(data, dict):
-            merged = dict(out)
-            merged.pop("data", None)
-            merged.update(data)
-            out = merged
+            del out["data"]
+            out.update(data)
             continue
 
         break
+    return out
 
-    raw_payload = out.get("raw_payload") or out.get("rawPayload")
-    if isinstance(raw_payload, dict):
-        raw: dict[str, Any] = dict(raw_payload)
-        for _ in range(6):
-            inner_payload = raw.get("payload")
-            if isinstance(inner_payload, dict):
-                merged = dict(raw)
-                merged.pop("payload", None)
-                merged.update(inner_payload)
-                raw = merged
-                continue
 
-            data = raw.get("data")
-            if isinstance(data, dict):
-                merged = dict(raw)
-                merged.pop("data", None)
-                merged.update(data)
-                raw = merged
-                continue
+# Top-level (snake_case, camelCase) key pairs; the camelCase value wins when set.
+_SNAKE_CASE_ALIASES: tuple[tuple[str, str], ...] = (
+    ("agent_session", "agentSession"),
+    ("agent_session_id", "agentSessionId"),
+    ("agent_activity", "agentActivity"),
+    ("agent_activity_id", "agentActivityId"),
+    ("issue_id", "issueId"),
+    ("issue_title", "issueTitle"),
+    ("prompt_context", "promptContext"),
+)
+
+
+def _unwrap_payload(payload: dict[str, Any]) -> dict[str, Any]:
+    """Normalize kai-gateway / Linear webhook payload wrappers.
+
+    Linear webhooks often wrap the event data under a top-level ``data`` key.
+    kai-gateway may also wrap the original webhook body under ``payload``.
+    Some kai-gateway deployments also preserve the full original webhook under
+    ``raw_payload``; we merge it in as a low-priority source of additional
+    fields (without overriding normalized keys).
+
+    We merge nested dict wrappers into a single dict so downstream extractors
+    can consistently look for ``agentSession`` / ``agentActivity`` fields.
+    Top-level snake_case aliases are folded into their camelCase names, so
+    extractors only ever read the camelCase key.
+    """
 
-            break
+    out = _merge_wrappers(dict(payload or {}))
 
+    raw_payload = out.get("raw_payload") or out.get("rawPayload")
+    if isinstance(raw_payload, dict):
+        raw = _merge_wrappers(dict(raw_payload))
         for key, value in raw.items():
             out.setdefault(key, value)
+
+    for snake, camel in _SNAKE_CASE_ALIASES:
+        if snake in out:
+            value = out.pop(snake)
+            if not out.get(camel):
+                out[camel] = value
     return out
 
 
-def _normalize_event_type(event_type: object, action: object) -> str:
-    raw = str(event_type or "")
-    raw_lower = raw.lower()
-    action_lower = action.lower() if isinstance(action, str) else None
+# Native Linear webhook types whose action arrives separately, keyed by lowercased type.
+_EVENT_TYPE_PREFIXES: dict[str, str] = {
+    "agentsessionevent": "agent_session.",
+}
+_KAI_GATEWAY_PREFIX = "agentsessionevent."
+
+
+def _normalize_event_type(event_type: str | None, action: str | None) -> str:
+    if (known := _KNOWN_EVENT_TYPES.get((event_type, action))) is not None:
+        return known
+    return _normalize_event_type_slow(event_type, action)
+
+
+def _normalize_event_type_slow(event_type: str | None, action: str | None) -> str:
+    if not event_type:
+        return ""
+    raw_lower = event_type.lower()
 
     # Native Linear webhook format: { type: "AgentSessionEvent", action: "created" }.
-    if raw == "AgentSessionEvent" or raw_lower == "agentsessionevent":
-        return f"agent_session.{action_lower}" if action_lower else ""
+    prefix = _EVENT_TYPE_PREFIXES.get(raw_lower)
+    if prefix is not None:
+        return prefix + action.lower() if action else ""
 
     # kai-gateway format: { event_type: "agentsessionevent.created" } (action already embedded).
-    if raw_lower.startswith("agentsessionevent."):
-        return "agent_session." + raw_lower.removeprefix("agentsessionevent.")
+    if raw_lower.startswith(_KAI_GATEWAY_PREFIX):
+        return "agent_session." + raw_lower[len(_KAI_GATEWAY_PREFIX) :]
 
     return raw_lower
 
 
+def _known_event_types() -> dict[tuple[str | None, str | None], str]:
+    # The spellings Linear and kai-gateway actually send for handled events, so
+    # those skip lower() and prefix matching; anything else takes the slow path.
+    table: dict[tuple[str | None, str | None], str] = {}
+    for normalized in _HANDLED_EVENTS:
+        action = normalized.removeprefix("agent_session.")
+        for key in (
+            ("AgentSessionEvent", action),
+            ("agentsessionevent", action),
+            (_KAI_GATEWAY_PREFIX + action, None),
+        ):
+            table[key] = _normalize_event_type_slow(*key)
+    return table
+
+
+_KNOWN_EVENT_TYPES: dict[tuple[str | None, str | None], str] = _known_event_types()
+
+
 def _extract_session_id(payload: dict[str, Any]) -> str | None:
-    agent_session = payload.get("agentSession") or payload.get("agent_session")
-    if isinstance(agent_session, dict):
-        sid = agent_session.get("id")
-        if isinstance(sid, str) and sid:
-            return sid
-    sid = payload.get("agentSessionId") or payload.get("agent_session_id")
-    if isinstance(sid, str) and sid:
-        return sid
-    sid = payload.get("id")
-    if isinstance(sid, str) and sid and "issue" in payload:
-        return sid
-    return None
+    return _extract_session_fields(payload).session_id
 
 
 def _extract_issue_title(payload: dict[str, Any]) -> str | None:
-    agent_session = payload.get("agentSession") or payload.get("agent_session")
-    if isinstance(agent_session, dict):
-        issue = agent_session.get("issue")
-        if isinstance(issue, dict):
-            title = issue.get("title")
-            if isinstance(title, str) and title.strip():
-                return title.strip()
-    issue = payload.get("issue")
-    if isinstance(issue, dict):
-        title = issue.get("title")
-        if isinstance(title, str) and title.strip():
-            return title.strip()
-    title = payload.get("issueTitle") or payload.get("issue_title")
-    if isinstance(title, str) and title.strip():
-        return title.strip()
-    return None
+    return _extract_session_fields(payload).issue_title
 
 
 _PROMPT_CONTEXT_TITLE_RE = re.compile(r"<title>(?P<title>[^<]+)</title>", re.IGNORECASE)
 
 
 def _extract_issue_title_from_prompt_context(payload: dict[str, Any]) -> str | None:
-    prompt_context = payload.get("promptContext") or payload.get("prompt_context")
-    if not isinstance(prompt_context, str) or not prompt_context.strip():
+    prompt_context = payload.get("promptContext")
+    # isspace() answers "blank?" without copying the whole context like strip() would.
+    if not isinstance(prompt_context, str) or not prompt_context or prompt_context.isspace():
         return None
-    match = _PROMPT_CONTEXT_TITLE_RE.search(prompt_context)
-    if match:
-        title = match.group("title").strip()
-        if title:
-            return title
+    # Fast path for the lowercase tag Linear emits; the regex covers mixed-case tags
+    # and titles that are not followed directly by their closing tag.
+    start = prompt_context.find("<title>")
+    if start >= 0:
+        start += len("<title>")
+        end = prompt_context.find("<", start)
+        if end > start and prompt_context.startswith("</title>", end):
+            if title := prompt_context[start:end].strip():
+                return title
+    if (match := _PROMPT_CONTEXT_TITLE_RE.search(prompt_context)) and (
+        title := match.group("title").strip()
+    ):
+        return title
     return None
 
 
 def _extract_issue_project_id(payload: dict[str, Any]) -> str | None:
-    agent_session = payload.get("agentSession") or payload.get("agent_session")
-    if isinstance(agent_session, dict):
-        issue = agent_session.get("issue")
-        if isinstance(issue, dict):
-            project = issue.get("project")
-            if isinstance(project, dict):
-                pid = project.get("id")
-                if isinstance(pid, str) and pid.strip():
-                    return pid.strip()
-            pid = issue.get("projectId") or issue.get("project_id")
-            if isinstance(pid, str) and pid.strip():
-                return pid.strip()
-    return None
+    return _extract_session_fields(payload).project_id
 
 
-def _extract_issue_id(payload: dict[str, Any]) -> str | None:
-    agent_session = payload.get("agentSession") or payload.get("agent_session")
-    if isinstance(agent_session, dict):
-        issue = agent_session.get("issue")
-        if isinstance(issue, dict):
-            iid = issue.get("id") or issue.get("issueId") or issue.get("issue_id")
-            if isinstance(iid, str) and iid.strip():
-                return iid.strip()
-    issue = payload.get("issue")
-    if isinstance(issue, dict):
-        iid = issue.get("id")
-        if isinstance(iid, str) and iid.strip():
-            return iid.strip()
-    iid = payload.get("issueId") or payload.get("issue_id")
-    if isinstance(iid, str) and iid.strip():
-        return iid.strip()
+def _coerce_text(value: object) -> str | None:
+    if isinstance(value, str) and (text := value.strip()):
+        return text
     return None
 
 
-def _coerce_text(value: object) -> str | None:
-    if isinstance(value, str):
-        text = value.strip()
-        if text:
-            return text
-    return None
+# Content types whose body Linear nests under a key named after the type.
+_ACTIVITY_NESTED_KEYS: tuple[str, ...] = (
+    "prompt",
+    "message",
+    "thought",
+    "elicitation",
+    "response",
+    "error",
+)
 
 
 def _extract_text_from_activity_content(content: dict[str, Any]) -> str | None:
@@ -277,7 +327,7 @@ def _extract_text_from_activity_content(content: dict[str, Any]) -> str | None:
 
     # Linear SDK content payloads often nest the actual body under the content type,
     # e.g. {"type": "message", "message": {"body": "..."} }.
-    for key in ("prompt", "message", "thought", "elicitation", "response", "error"):
+    for key in _ACTIVITY_NESTED_KEYS:
         nested = content.get(key)
         if isinstance(nested, dict):
             nested_body = _coerce_text(nested.get("body")) or _coerce_text(nested.get("text"))
@@ -310,15 +360,19 @@ def _extract_activity_body(agent_activity: object) -> str | None:
     if not isinstance(agent_activity, dict):
         return None
 
-    body = _coerce_text(agent_activity.get("body"))
-    if body is not None:
+    body = agent_activity.get("body")
+    if isinstance(body, str) and (body := body.strip()):
         return body
 
     content: object = agent_activity.get("content")
     if isinstance(content, str):
-        try:
-            content = json.loads(content)
-        except json.JSONDecodeError:
+        # Only a JSON object can yield a body; don't try to parse plain text.
+        if content.startswith("{") or (content[:1].isspace() and content.lstrip().startswith("{")):
+            try:
+                content = jsonutil.loads(content)
+            except json.JSONDecodeError:
+                content = None
+        else:
             content = None
 
     if isinstance(content, dict):
@@ -330,13 +384,15 @@ def _extract_activity_body(agent_activity: object) -> str | None:
 
 
 def _extract_prompt_body(payload: dict[str, Any]) -> str | None:
+    return _extract_session_fields(payload).prompt_body
+
+
+def _prompt_body_from(agent_activity: object, prompt_context: object) -> str | None:
     # For `prompted` session events, Linear includes the user's message in agentActivity.body.
-    agent_activity = payload.get("agentActivity") or payload.get("agent_activity")
     body = _extract_activity_body(agent_activity)
     if body is not None:
         return body
     # Fallbacks
-    prompt_context = payload.get("promptContext") or payload.get("prompt_context")
     body = _coerce_text(prompt_context)
     if body is not None:
         return body
@@ -347,29 +403,141 @@ def _extract_prompt_body(payload: dict[str, Any]) -> str | None:
     return None
 
 
-def _extract_agent_activity_id(payload: dict[str, Any]) -> str | None:
-    agent_activity = payload.get("agentActivity") or payload.get("agent_activity")
+@dataclass(slots=True)
+class _SessionFields:
+    session_id: str | None = None
+    issue_id: str | None = None
+    issue_title: str | None = None
+    project_id: str | None = None
+    activity_id: str | None = None
+    prompt_body: str | None = None
+
+
+def _extract_session_fields(payload: dict[str, Any]) -> _SessionFields:
+    """Read every field ``_handle_event`` needs in one walk over an unwrapped payload.
+
+    ``agentSession.issue`` takes priority over top-level ``issue`` / ``issueId``
+    style fields; the project id is only read from the session's issue.
+    """
+
+    fields = _SessionFields()
+
+    agent_session = payload.get("agentSession")
+    if isinstance(agent_session, dict):
+        sid = agent_session.get("id")
+        if isinstance(sid, str) and sid:
+            fields.session_id = sid
+        issue = agent_session.get("issue")
+        if isinstance(issue, dict):
+            title = issue.get("title")
+            if isinstance(title, str) and (title := title.strip()):
+                fields.issue_title = title
+            iid = issue.get("id") or issue.get("issueId") or issue.get("issue_id")
+            if isinstance(iid, str) and (iid := iid.strip()):
+                fields.issue_id = iid
+            project = issue.get("project")
+            if (
+                isinstance(project, dict)
+                and isinstance(pid := project.get("id"), str)
+                and (pid := pid.strip())
+            ):
+                fields.project_id = pid
+            elif isinstance(pid := issue.get("projectId") or issue.get("project_id"), str) and (
+                pid := pid.strip()
+            ):
+                fields.project_id = pid
+
+    if fields.session_id is None:
+        sid = payload.get("agentSessionId")
+        if isinstance(sid, str) and sid:
+            fields.session_id = sid
+        else:
+            sid = payload.get("id")
+            if isinstance(sid, str) and sid and "issue" in payload:
+                fields.session_id = sid
+
+    issue = payload.get("issue")
+    if isinstance(issue, dict):
+        if fields.issue_title is None:
+            fields.issue_title = _coerce_text(issue.get("title"))
+        if fields.issue_id is None:
+            fields.issue_id = _coerce_text(issue.get("id"))
+    if fields.issue_title is None:
+        fields.issue_title = _coerce_text(payload.get("issueTitle"))
+    if fields.issue_id is None:
+        fields.issue_id = _coerce_text(payload.get("issueId"))
+
+    agent_activity = payload.get("agentActivity")
     if isinstance(agent_activity, dict):
-        aid = agent_activity.get("id") or agent_activity.get("agentActivityId") or agent_activity.get("agent_activity_id")
-        if isinstance(aid, str) and aid.strip():
-            return aid.strip()
-    aid = payload.get("agentActivityId") or payload.get("agent_activity_id")
-    if isinstance(aid, str) and aid.strip():
-        return aid.strip()
-    return None
+        aid = (
+            agent_activity.get("id")
+            or agent_activity.get("agentActivityId")
+            or agent_activity.get("agent_activity_id")
+        )
+        if isinstance(aid, str) and (aid := aid.strip()):
+            fields.activity_id = aid
+    if fields.activity_id is None:
+        fields.activity_id = _coerce_text(payload.get("agentActivityId"))
+
+    fields.prompt_body = _prompt_body_from(agent_activity, payload.get("promptContext"))
+    return fields
+
+
+@dataclass(slots=True)
+class _ParsedEvent:
+    event_type: str
+    payload: dict[str, Any]
+    fields: _SessionFields | None = None
+
+
+def _parse_event(event: GatewayEvent) -> _ParsedEvent:
+    """Unwrap and classify a gateway event.
+
+    ``event_type`` is normalized. For the event types ``_handle_event`` acts on,
+    ``payload`` is unwrapped and ``fields`` extracted; for anything else ``fields``
+    is ``None`` and ``payload`` may be left as received.
+    """
+
+    # The event_type column wins over the payload, so most unrelated events can be
+    # dropped before the payload is copied and unwrapped.
+    if event.event_type and event.event_type.lower() not in _EVENT_TYPE_PREFIXES:
+        normalized = _normalize_event_type(event.event_type, None)
+        if normalized not in _HANDLED_EVENTS:
+            return _ParsedEvent(event_type=normalized, payload=event.payload)
+
+    payload = _unwrap_payload(event.payload)
+    event_type = event.event_type or payload.get("event_type") or payload.get("type")
+    action = payload.get("action")
+    normalized = _normalize_event_type(
+        event_type if isinstance(event_type, str) else None,
+        action if isinstance(action, str) else None,
+    )
+    if normalized not in _HANDLED_EVENTS:
+        return _ParsedEvent(event_type=normalized, payload=payload)
+    return _ParsedEvent(
+        event_type=normalized, payload=payload, fields=_extract_session_fields(payload)
+    )
+
+
+# Gateway retries re-deliver the same prompted event; activity bodies never change.
+_activity_body_cache: TTLCache[str, str] = TTLCache(maxsize=4096, ttl=300.0)
 
 
 async def _maybe_fetch_prompt_from_linear(
-    payload: dict[str, Any], *, client: LinearClient
+    activity_id: str | None, *, client: LinearClient
 ) -> str | None:
-    activity_id = _extract_agent_activity_id(payload)
     if not activity_id:
         return None
+    if (cached := _activity_body_cache.get(activity_id)) is not None:
+        return cached
     try:
         activity = await client.get_agent_activity(activity_id)
     except LinearApiError:
         return None
-    return _extract_activity_body(activity)
+    body = _extract_activity_body(activity)
+    if body:
+        _activity_body_cache[activity_id] = body
+    return body
 
 
 @dataclass(slots=True)
@@ -377,15 +545,49 @@ class _SessionState:
     resume: ResumeToken | None = None
     context: RunContext | None = None
     stop_requested: bool = False
-    run_lock: Any = field(default_factory=anyio.Lock)
+    # Both created on first run; sessions that only ever see a stop event never
+    # need them. Each run gets a fresh stop_event, so a stop between runs has
+    # nothing to wake.
+    stop_event: anyio.Event | None = None
+    run_lock: anyio.Lock | None = None
     running_tasks: RunningTasks = field(default_factory=dict)
+    # Run-invariant log fields, rebuilt only when the engine, context or cwd change.
+    log_key: tuple[Any, ...] | None = None
+    log_context: dict[str, Any] = field(default_factory=dict)
+
+    def ensure_run_lock(self) -> anyio.Lock:
+        if self.run_lock is None:
+            self.run_lock = anyio.Lock()
+        return self.run_lock
+
+    def run_in_flight(self) -> bool:
+        return self.run_lock is not None and self.run_lock.locked()
+
+
+def _session_busy(state: _SessionState) -> bool:
+    return bool(state.running_tasks) or state.run_in_flight()
+
+
+async def _evict_stopped_session(
+    sessions: MutableMapping[str, _SessionState], session_id: str, state: _SessionState
+) -> None:
+    # Wait out the run holding the lock and any queued before the stop. A run that
+    # started after the stop, or one still queued, keeps the session.
+    if state.run_lock is not None:
+        async with state.run_lock:
+            if state.run_lock.statistics().tasks_waiting:
+                return
+    if state.stop_requested and not state.running_tasks and sessions.get(session_id) is state:
+        sessions.pop(session_id, None)
 
 
 def _request_cancel(state: _SessionState) -> int:
-    tasks = list(state.running_tasks.values())
-    for task in tasks:
+    # Event.set() never yields, so running_tasks cannot change mid-iteration.
+    count = 0
+    for task in state.running_tasks.values():
         task.cancel_requested.set()
-    return len(tasks)
+        count += 1
+    return count
 
 
 async def _run_engine_for_session(
@@ -398,6 +600,10 @@ async def _run_engine_for_session(
     state: _SessionState,
     default_engine_override: str | None,
 ) -> None:
+    # _handle_event gives each run a fresh event; callers that don't still get one.
+    stop_event = state.stop_event
+    if stop_event is None:
+        stop_event = state.stop_event = anyio.Event()
     resolved = runtime.resolve_message(
         text=text,
         reply_text=None,
@@ -451,15 +657,21 @@ async def _run_engine_for_session(
         state.resume = resume_token
 
     try:
+        log_key = (runner.engine, context, cwd)
+        if state.log_key != log_key:
+            state.log_key = log_key
+            state.log_context = {
+                "transport": "linear",
+                "channel_id": session_id,
+                "engine": runner.engine,
+                "project": context.project if context else None,
+                "branch": context.branch if context else None,
+                "cwd": str(cwd) if cwd is not None else None,
+            }
         bind_run_context(
-            transport="linear",
-            channel_id=session_id,
+            **state.log_context,
             user_msg_id=user_msg_id,
-            engine=runner.engine,
             resume=resume.value if resume else None,
-            project=context.project if context else None,
-            branch=context.branch if context else None,
-            cwd=str(cwd) if cwd is not None else None,
         )
         incoming = IncomingMessage(
             channel_id=session_id,
@@ -467,9 +679,16 @@ async def _run_engine_for_session(
             text=resolved.prompt,
         )
         context_line = runtime.format_context_line(context)
-        run_done = anyio.Event()
 
-        async def run_handle() -> None:
+        async def watch_stop() -> None:
+            # Idle until a stop arrives; then retry briefly in case the stop raced
+            # ahead of handle_message registering its running task.
+            await stop_event.wait()
+            while not _request_cancel(state):
+                await anyio.sleep(0.05)
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(watch_stop)
             try:
                 await handle_message(
                     exec_cfg,
@@ -483,18 +702,7 @@ async def _run_engine_for_session(
                     on_thread_known=on_thread_known,
                 )
             finally:
-                run_done.set()
-
-        async def watch_stop() -> None:
-            while not run_done.is_set():
-                if state.stop_requested:
-                    if _request_cancel(state):
-                        return
-                await anyio.sleep(0.05)
-
-        async with anyio.create_task_group() as tg:
-            tg.start_soon(watch_stop)
-            tg.start_soon(run_handle)
+                tg.cancel_scope.cancel()
         state.context = context
     finally:
         reset_run_base_dir(run_base_token)
@@ -522,26 +730,47 @@ class _ResumeLineProxy:
         return self.runner.run(prompt, resume)
 
 
+# Acks are flushed once this many have queued up, or after the interval.
+_ACK_BATCH_SIZE = 64
+_ACK_FLUSH_INTERVAL_S = 0.2
+
+
 async def _run_loop(
     *,
     settings: LinearTransportSettings,
     runtime: TransportRuntime,
     exec_cfg: ExecBridgeConfig,
+    client: LinearClient,
     default_engine_override: str | None,
     config_path: Path,
 ) -> None:
-    client = cast(LinearClient, getattr(exec_cfg.transport, "_client", None))
     project_map = _load_linear_project_map(config_path)
-    sessions: dict[str, _SessionState] = {}
+    sessions: TTLCache[str, _SessionState] = TTLCache(
+        maxsize=settings.max_sessions,
+        ttl=settings.session_ttl,
+        pinned=_session_busy,
+    )
+    limiter = anyio.Semaphore(settings.max_concurrent_events)
 
     poller = GatewayPoller(
         database_url=settings.gateway_database_url,
         source=settings.source,
         batch_size=settings.poll_batch_size,
+        notify_channel=settings.notify_channel,
+        ack_batch_size=_ACK_BATCH_SIZE,
     )
 
+    async def flush_acks_periodically() -> None:
+        while True:
+            await anyio.sleep(_ACK_FLUSH_INTERVAL_S)
+            try:
+                await poller.flush()
+            except Exception:
+                logger.exception("event.ack_flush_failed")
+
     async with poller:
         async with anyio.create_task_group() as tg:
+            tg.start_soon(flush_acks_periodically)
 
             async def handle_and_mark(event: GatewayEvent) -> None:
                 try:
@@ -554,6 +783,8 @@ async def _run_loop(
                         project_map=project_map,
                         sessions=sessions,
                         default_engine_override=default_engine_override,
+                        limiter=limiter,
+                        background=tg,
                     )
                 except Exception as exc:
                     logger.exception(
@@ -564,7 +795,7 @@ async def _run_loop(
                         error_type=exc.__class__.__name__,
                     )
                     try:
-                        await poller.mark_failed(event.id, error=str(exc))
+                        await poller.ack_failed(event.id, error=str(exc))
                     except Exception:
                         logger.exception(
                             "event.mark_failed_failed",
@@ -574,7 +805,7 @@ async def _run_loop(
                     return
 
                 try:
-                    await poller.mark_done(event.id)
+                    await poller.ack_done(event.id)
                 except Exception:
                     logger.exception(
                         "event.mark_done_failed",
@@ -582,15 +813,60 @@ async def _run_loop(
                         event_type=event.event_type,
                     )
 
+            idle_interval = settings.poll_interval
+            max_interval = max(settings.poll_max_interval, settings.poll_interval)
             while True:
-                events = await poller.poll()
+                try:
+                    events = await poller.poll()
+                    if not events:
+                        await poller.wait_for_events(idle_interval)
+                except Exception as exc:
+                    logger.warning(
+                        "poll.failed",
+                        error=str(exc),
+                        error_type=exc.__class__.__name__,
+                        retry_in=idle_interval,
+                    )
+                    await poller.sleep(idle_interval)
+                    events = []
                 if not events:
-                    await poller.sleep(settings.poll_interval)
+                    idle_interval = min(idle_interval * 2, max_interval)
                     continue
+                idle_interval = settings.poll_interval
                 for event in events:
                     tg.start_soon(handle_and_mark, event)
 
 
+# Runs that finish sooner than this only get the final plan update.
+_INITIAL_PLAN_DELAY_S = 2.0
+
+_INITIAL_PLAN: tuple[PlanStep, ...] = (
+    {"content": "Analyze request", "status": "inProgress"},
+    {"content": "Implement changes", "status": "pending"},
+    {"content": "Run tests", "status": "pending"},
+    {"content": "Summarize results", "status": "pending"},
+)
+_COMPLETED_PLAN: tuple[PlanStep, ...] = tuple(
+    PlanStep(content=step["content"], status="completed") for step in _INITIAL_PLAN
+)
+
+
+async def _safe_set_plan(
+    client: LinearClient, session_id: str, steps: tuple[PlanStep, ...], *, failure_event: str
+) -> None:
+    try:
+        await client.set_agent_plan(session_id=session_id, steps=steps)
+    except (LinearApiError, Exception):
+        logger.debug(failure_event, session_id=session_id)
+
+
+async def _set_initial_plan_later(client: LinearClient, session_id: str) -> None:
+    await anyio.sleep(_INITIAL_PLAN_DELAY_S)
+    # Once started, let the update land so it can't overwrite the final plan.
+    with anyio.CancelScope(shield=True):
+        await _safe_set_plan(client, session_id, _INITIAL_PLAN, failure_event="plan.set_failed")
+
+
 async def _handle_event(
     *,
     event: GatewayEvent,
@@ -599,35 +875,35 @@ async def _handle_event(
     client: LinearClient,
     settings: LinearTransportSettings,
     project_map: dict[str, str],
-    sessions: dict[str, _SessionState],
+    sessions: MutableMapping[str, _SessionState],
     default_engine_override: str | None,
+    limiter: anyio.Semaphore | None = None,
+    background: TaskGroup | None = None,
 ) -> None:
     _ = settings
-    payload = _unwrap_payload(event.payload)
-
-    event_type = event.event_type or payload.get("event_type") or payload.get("type")
-    action = payload.get("action")
-
-    normalized = _normalize_event_type(event_type, action)
-
-    if normalized not in {"agent_session.created", "agent_session.prompted", *_STOP_SESSION_EVENTS}:
+    parsed = _parse_event(event)
+    normalized = parsed.event_type
+    if parsed.fields is None:
         logger.debug("event.ignored", event_id=event.id, event_type=normalized)
         return
-
-    session_id = _extract_session_id(payload)
+    payload = parsed.payload
+    fields = parsed.fields
+    session_id = fields.session_id
     if not session_id:
         raise RuntimeError(f"Missing agent session id in event payload: {event.payload!r}")
+    # Every event for a session then looks it up by the same key object.
+    session_id = sys.intern(session_id)
 
-    state = sessions.setdefault(session_id, _SessionState())
+    state = sessions.get(session_id)
+    if state is None:
+        state = sessions[session_id] = _SessionState()
 
     if normalized in _STOP_SESSION_EVENTS:
         state.stop_requested = True
+        if state.stop_event is not None:
+            state.stop_event.set()
         cancelled = _request_cancel(state)
-        run_in_flight = False
-        try:
-            run_in_flight = bool(state.run_lock.locked())
-        except Exception:
-            run_in_flight = False
+        run_in_flight = state.run_in_flight()
 
         logger.info(
             "session.stop_requested",
@@ -642,36 +918,33 @@ async def _handle_event(
                 channel_id=session_id,
                 message=RenderedMessage(
                     text="Stop requested. Cancelling…",
-                    extra={"activity_type": "thought", "ephemeral": True},
+                    extra=_THOUGHT_EXTRA,
                 ),
             )
+        await _evict_stopped_session(sessions, session_id, state)
         return
 
-    async with state.run_lock:
+    # The limiter is taken after the session lock so that events queued behind one
+    # busy session don't hold slots, and stop events above never wait on it.
+    async with state.ensure_run_lock(), limiter if limiter is not None else nullcontext():
         state.stop_requested = False
-
-        if normalized == "agent_session.created":
-            steps: list[PlanStep] = [
-                {"content": "Analyze request", "status": "inProgress"},
-                {"content": "Implement changes", "status": "pending"},
-                {"content": "Run tests", "status": "pending"},
-                {"content": "Summarize results", "status": "pending"},
-            ]
-            try:
-                await client.set_agent_plan(session_id=session_id, steps=steps)
-            except (LinearApiError, Exception):
-                logger.debug("plan.set_failed", session_id=session_id)
+        state.stop_event = anyio.Event()
 
         issue_id: str | None = None
         issue_from_api: dict[str, Any] | None = None
 
-        project_id = _extract_issue_project_id(payload)
-        issue_title = _extract_issue_title(payload) or _extract_issue_title_from_prompt_context(payload)
-        prompt_from_payload = _extract_prompt_body(payload)
+        project_id = fields.project_id
+        issue_title = fields.issue_title or _extract_issue_title_from_prompt_context(payload)
+        prompt_from_payload = fields.prompt_body
 
         if normalized == "agent_session.created":
-            issue_id = _extract_issue_id(payload)
-            if issue_id is not None and (project_id is None or issue_title is None):
+            issue_id = fields.issue_id
+            # Only pay for the issue round-trip when it can change the outcome: the
+            # project is needed to pick a context, the title only when there is
+            # no prompt text to fall back on.
+            need_project = project_id is None and state.context is None
+            need_title = issue_title is None and prompt_from_payload is None
+            if issue_id is not None and (need_project or need_title):
                 try:
                     issue_from_api = await client.get_issue(issue_id)
                 except LinearApiError:
@@ -692,7 +965,7 @@ async def _handle_event(
         if not prompt_body and (
             normalized != "agent_session.created" or issue_title is None
         ):
-            prompt_body = await _maybe_fetch_prompt_from_linear(payload, client=client)
+            prompt_body = await _maybe_fetch_prompt_from_linear(fields.activity_id, client=client)
 
         if normalized == "agent_session.created":
             if issue_title and prompt_body and issue_title not in prompt_body:
@@ -724,7 +997,7 @@ async def _handle_event(
             channel_id=session_id,
             message=RenderedMessage(
                 text="Acknowledged. Starting…",
-                extra={"activity_type": "thought", "ephemeral": True},
+                extra=_THOUGHT_EXTRA,
             ),
         )
 
@@ -737,29 +1010,39 @@ async def _handle_event(
             )
             return
 
-        await _run_engine_for_session(
-            exec_cfg=exec_cfg,
-            runtime=runtime,
-            session_id=session_id,
-            user_msg_id=event.id,
-            text=prompt,
-            state=state,
-            default_engine_override=default_engine_override,
-        )
-
-        if normalized == "agent_session.created" and not state.stop_requested:
+        async with anyio.create_task_group() as tg:
+            if normalized == "agent_session.created":
+                tg.start_soon(_set_initial_plan_later, client, session_id)
             try:
-                await client.set_agent_plan(
+                await _run_engine_for_session(
+                    exec_cfg=exec_cfg,
+                    runtime=runtime,
                     session_id=session_id,
-                    steps=[
-                        {"content": "Analyze request", "status": "completed"},
-                        {"content": "Implement changes", "status": "completed"},
-                        {"content": "Run tests", "status": "completed"},
-                        {"content": "Summarize results", "status": "completed"},
-                    ],
+                    user_msg_id=event.id,
+                    text=prompt,
+                    state=state,
+                    default_engine_override=default_engine_override,
+                )
+            finally:
+                tg.cancel_scope.cancel()
+
+        if normalized == "agent_session.created" and not state.stop_requested:
+            # Best-effort; in the run loop it is handed off so the session lock and
+            # the concurrency slot are released without waiting on Linear.
+            if background is not None:
+                background.start_soon(
+                    functools.partial(
+                        _safe_set_plan,
+                        client,
+                        session_id,
+                        _COMPLETED_PLAN,
+                        failure_event="plan.finalize_failed",
+                    )
+                )
+            else:
+                await _safe_set_plan(
+                    client, session_id, _COMPLETED_PLAN, failure_event="plan.finalize_failed"
                 )
-            except (LinearApiError, Exception):
-                logger.debug("plan.finalize_failed", session_id=session_id)
 
 
 class LinearBackend(TransportBackend):
@@ -780,7 +1063,7 @@ class LinearBackend(TransportBackend):
             issues.append(install_issue(cmd, engine_backend.install_cmd))
 
         try:
-            raw = read_config(config_path)
+            raw = _read_config(config_path)
         except ConfigError:
             issues.append(_config_issue(config_path, title="create a config"))
             return SetupResult(issues=issues, config_path=config_path)
@@ -820,7 +1103,7 @@ class LinearBackend(TransportBackend):
     ) -> None:
         settings = _expect_settings(transport_config)
         client = LinearClient(settings.oauth_token, api_url=settings.api_url)
-        transport = LinearTransport(client)
+        transport = LinearTransport(client, debounce_s=settings.debounce_ms / 1000)
         presenter = LinearPresenter(
             message_overflow=settings.message_overflow,
             max_body_chars=settings.max_body_chars,
@@ -832,13 +1115,17 @@ class LinearBackend(TransportBackend):
         )
 
         async def run() -> None:
-            await _run_loop(
-                settings=settings,
-                runtime=runtime,
-                exec_cfg=exec_cfg,
-                default_engine_override=default_engine_override,
-                config_path=config_path,
-            )
+            async with anyio.create_task_group() as tg:
+                transport.bind_task_group(tg)
+                client.start_activity_worker(tg)
+                await _run_loop(
+                    settings=settings,
+                    runtime=runtime,
+                    exec_cfg=exec_cfg,
+                    client=transport.client,
+                    default_engine_override=default_engine_override,
+                    config_path=config_path,
+                )
 
         anyio.run(run)
 
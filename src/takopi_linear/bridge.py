@@ -1,21 +1,37 @@
 from __future__ import annotations
 
+import re
+from collections.abc import Callable
 from dataclasses import dataclass
 from typing import Any, cast
 
+import anyio
+from anyio.abc import TaskGroup
+from takopi.logging import get_logger
 from takopi.markdown import MarkdownFormatter, assemble_markdown_parts
 from takopi.progress import ProgressState
 from takopi.transport import MessageRef, RenderedMessage, SendOptions
 
+from .cache import TTLCache
 from .client import LinearClient
 from .types import AgentActivityType
 
+logger = get_logger(__name__)
+
+_NEWLINE_RUN_RE = re.compile(r"\n*")
+
+# Sessions whose last ephemeral frame is remembered; older ones are forgotten first.
+_LAST_EPHEMERAL_MAXSIZE = 1024
+
 
 def _split_text(text: str, *, max_chars: int) -> list[str]:
-    text = (text or "").strip()
     if not text:
         return [""]
+    # Most answers fit: check the raw length first so only they pay for strip().
     if max_chars <= 0 or len(text) <= max_chars:
+        return [text.strip()]
+    text = text.strip()
+    if len(text) <= max_chars:
         return [text]
     parts: list[str] = []
     start = 0
@@ -36,13 +52,16 @@ def _split_text(text: str, *, max_chars: int) -> list[str]:
         chunk = text[start:cut].rstrip()
         if chunk:
             parts.append(chunk)
-        start = cut
-        while start < n and text[start] == "\n":
-            start += 1
+        # \n* matches the empty string too, so there is always a match.
+        newlines = _NEWLINE_RUN_RE.match(text, cut)
+        assert newlines is not None
+        start = newlines.end()
     return parts or [text[:max_chars].rstrip()]
 
 
 class LinearPresenter:
+    __slots__ = ("_formatter", "_message_overflow", "_max_body_chars")
+
     def __init__(
         self,
         *,
@@ -114,44 +133,141 @@ class _ActivitySpec:
     ephemeral: bool | None
 
 
+def _build_body_content(message: RenderedMessage, activity_type: AgentActivityType) -> dict[str, Any]:
+    return {"type": activity_type, "body": message.text}
+
+
+def _build_action_content(message: RenderedMessage, activity_type: AgentActivityType) -> dict[str, Any]:
+    extra = message.extra
+    content: dict[str, Any] = {"type": activity_type}
+    for key in ("action", "parameter", "result"):
+        value = extra.get(key)
+        if isinstance(value, str) and (value := value.strip()):
+            content[key] = value
+    if "action" not in content:
+        content["action"] = "message"
+    if "parameter" not in content and (text := message.text.strip()):
+        content["parameter"] = text
+    return content
+
+
+_CONTENT_BUILDERS: dict[str, Callable[[RenderedMessage, AgentActivityType], dict[str, Any]]] = {
+    "thought": _build_body_content,
+    "action": _build_action_content,
+    "elicitation": _build_body_content,
+    "response": _build_body_content,
+    "error": _build_body_content,
+}
+
+# Linear only honours ``ephemeral`` on these activity types.
+_EPHEMERAL_TYPES = frozenset({"thought", "action"})
+
+
 def _activity_from_message(message: RenderedMessage, *, default_type: AgentActivityType) -> _ActivitySpec:
-    raw_type = message.extra.get("activity_type", default_type)
-    activity_type: AgentActivityType
-    if raw_type in {"thought", "action", "elicitation", "response", "error"}:
-        activity_type = cast(AgentActivityType, raw_type)
-    else:
+    extra = message.extra
+    activity_type = extra.get("activity_type", default_type)
+    builder = _CONTENT_BUILDERS.get(activity_type)
+    if builder is None:
         activity_type = default_type
+        builder = _CONTENT_BUILDERS[default_type]
 
     ephemeral: bool | None = None
-    if "ephemeral" in message.extra:
-        ephemeral = bool(message.extra.get("ephemeral"))
-    if activity_type not in {"thought", "action"}:
-        ephemeral = None
-
-    if activity_type == "action":
-        action = message.extra.get("action")
-        parameter = message.extra.get("parameter")
-        result = message.extra.get("result")
-        content: dict[str, Any] = {"type": "action"}
-        if isinstance(action, str) and action.strip():
-            content["action"] = action.strip()
-        if isinstance(parameter, str) and parameter.strip():
-            content["parameter"] = parameter.strip()
-        if isinstance(result, str) and result.strip():
-            content["result"] = result.strip()
-        if "action" not in content:
-            content["action"] = "message"
-        if "parameter" not in content and message.text.strip():
-            content["parameter"] = message.text.strip()
-        return _ActivitySpec(type=activity_type, content=content, ephemeral=ephemeral)
-
-    content = {"type": activity_type, "body": message.text}
-    return _ActivitySpec(type=activity_type, content=content, ephemeral=ephemeral)
+    if activity_type in _EPHEMERAL_TYPES and "ephemeral" in extra:
+        ephemeral = bool(extra["ephemeral"])
+
+    return _ActivitySpec(
+        type=cast(AgentActivityType, activity_type),
+        content=builder(message, activity_type),
+        ephemeral=ephemeral,
+    )
 
 
 class LinearTransport:
-    def __init__(self, client: LinearClient) -> None:
+    __slots__ = (
+        "_client",
+        "_last_ephemeral",
+        "_debounce_s",
+        "_task_group",
+        "_pending",
+        "_flushing",
+    )
+
+    def __init__(self, client: LinearClient, *, debounce_s: float = 0.0) -> None:
         self._client = client
+        # Last ephemeral activity per session; re-rendering an unchanged progress
+        # frame (same text within the same elapsed second) is not re-posted. A
+        # non-ephemeral (final) activity clears the entry; sessions that never
+        # send one are bounded by the LRU.
+        self._last_ephemeral: TTLCache[str, tuple[AgentActivityType, dict[str, Any]]] = (
+            TTLCache(maxsize=_LAST_EPHEMERAL_MAXSIZE, ttl=0)
+        )
+        # Ephemeral thought edits are coalesced for debounce_s and only the latest
+        # is posted; Linear replaces each ephemeral activity with the next anyway.
+        self._debounce_s = float(debounce_s)
+        self._task_group: TaskGroup | None = None
+        self._pending: dict[str, _ActivitySpec] = {}
+        self._flushing: dict[str, anyio.Event] = {}
+
+    def bind_task_group(self, task_group: TaskGroup) -> None:
+        """Enable debouncing; delayed flushes run in ``task_group``."""
+        self._task_group = task_group
+
+    def _debounces(self, spec: _ActivitySpec, followups: list[RenderedMessage]) -> bool:
+        return (
+            self._debounce_s > 0
+            and self._task_group is not None
+            and bool(spec.ephemeral)
+            and spec.type == "thought"
+            and not followups
+        )
+
+    def _schedule(self, session_id: str, spec: _ActivitySpec) -> None:
+        scheduled = session_id in self._pending
+        self._pending[session_id] = spec
+        if not scheduled:
+            cast(TaskGroup, self._task_group).start_soon(self._flush_later, session_id)
+
+    async def _flush_later(self, session_id: str) -> None:
+        await anyio.sleep(self._debounce_s)
+        # Flushes of one session run one at a time so their activities land in order.
+        while (flushing := self._flushing.get(session_id)) is not None:
+            await flushing.wait()
+        spec = self._pending.pop(session_id, None)
+        if spec is None:
+            return
+        done = self._flushing[session_id] = anyio.Event()
+        try:
+            if self._last_ephemeral.get(session_id) != (spec.type, spec.content):
+                await self._client.create_agent_activity(
+                    session_id=session_id,
+                    content=spec.content,
+                    ephemeral=spec.ephemeral,
+                )
+                self._remember(session_id, spec)
+        except Exception:
+            logger.debug("activity.flush_failed", session_id=session_id)
+        finally:
+            if self._flushing.get(session_id) is done:
+                del self._flushing[session_id]
+            done.set()
+
+    async def _settle(self, session_id: str) -> None:
+        # A pending frame is stale once something newer is posted, and an in-flight
+        # one must land first so it cannot end up after the newer activity.
+        self._pending.pop(session_id, None)
+        flushing = self._flushing.get(session_id)
+        if flushing is not None:
+            await flushing.wait()
+
+    def _remember(self, session_id: str, spec: _ActivitySpec) -> None:
+        if spec.ephemeral:
+            self._last_ephemeral[session_id] = (spec.type, spec.content)
+        else:
+            self._last_ephemeral.pop(session_id, None)
+
+    @property
+    def client(self) -> LinearClient:
+        return self._client
 
     @staticmethod
     def _extract_followups(message: RenderedMessage) -> list[RenderedMessage]:
@@ -160,6 +276,24 @@ class LinearTransport:
             return []
         return [item for item in followups if isinstance(item, RenderedMessage)]
 
+    async def _send_followups(
+        self,
+        session_id: str,
+        followups: list[RenderedMessage],
+        *,
+        default_type: AgentActivityType,
+    ) -> None:
+        # Followups are consecutive chunks of one split answer. Linear orders the
+        # activity feed by creation time, so they are posted one after another.
+        for followup in followups:
+            spec = _activity_from_message(followup, default_type=default_type)
+            await self._client.create_agent_activity(
+                session_id=session_id,
+                content=spec.content,
+                ephemeral=spec.ephemeral,
+            )
+            self._remember(session_id, spec)
+
     async def close(self) -> None:
         await self._client.aclose()
 
@@ -175,24 +309,23 @@ class LinearTransport:
         _ = options  # no per-message reply/edit semantics
 
         spec = _activity_from_message(message, default_type="thought")
+        await self._settle(session_id)
+        # Status messages nobody edits can be queued on the client instead of
+        # holding up the caller for the round-trip.
         activity = await self._client.create_agent_activity(
             session_id=session_id,
             content=spec.content,
             ephemeral=spec.ephemeral,
+            async_mode=bool(message.extra.get("async_mode")) and not followups,
         )
+        self._remember(session_id, spec)
         ref = MessageRef(
             channel_id=session_id,
             message_id=str(activity.get("id") or ""),
             raw=activity,
             thread_id=None,
         )
-        for followup in followups:
-            spec2 = _activity_from_message(followup, default_type=spec.type)
-            await self._client.create_agent_activity(
-                session_id=session_id,
-                content=spec2.content,
-                ephemeral=spec2.ephemeral,
-            )
+        await self._send_followups(session_id, followups, default_type=spec.type)
         return ref
 
     async def edit(
@@ -208,24 +341,29 @@ class LinearTransport:
         _ = wait
         followups = self._extract_followups(message)
         spec = _activity_from_message(message, default_type="thought")
+        if self._debounces(spec, followups):
+            self._schedule(session_id, spec)
+            return ref
+        await self._settle(session_id)
+        if (
+            spec.ephemeral
+            and not followups
+            and self._last_ephemeral.get(session_id) == (spec.type, spec.content)
+        ):
+            return ref
         activity = await self._client.create_agent_activity(
             session_id=session_id,
             content=spec.content,
             ephemeral=spec.ephemeral,
         )
+        self._remember(session_id, spec)
         out = MessageRef(
             channel_id=session_id,
             message_id=str(activity.get("id") or ref.message_id),
             raw=activity,
             thread_id=None,
         )
-        for followup in followups:
-            spec2 = _activity_from_message(followup, default_type=spec.type)
-            await self._client.create_agent_activity(
-                session_id=session_id,
-                content=spec2.content,
-                ephemeral=spec2.ephemeral,
-            )
+        await self._send_followups(session_id, followups, default_type=spec.type)
         return out
 
     async def delete(self, *, ref: MessageRef) -> bool:
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterator, MutableMapping
+from typing import Generic, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class TTLCache(MutableMapping[K, V], Generic[K, V]):
+    """Bounded LRU mapping whose entries expire ``ttl`` seconds after last use.
+
+    Values for which ``pinned`` returns true are never evicted, so the cache may
+    temporarily exceed ``maxsize`` while they are pinned. A ``ttl`` of zero
+    disables expiry.
+    """
+
+    def __init__(
+        self,
+        *,
+        maxsize: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+        pinned: Callable[[V], bool] | None = None,
+    ) -> None:
+        self._maxsize = int(maxsize)
+        self._ttl = float(ttl)
+        self._clock = clock
+        self._pinned = pinned
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def _is_pinned(self, value: V) -> bool:
+        return self._pinned is not None and self._pinned(value)
+
+    def _expired(self, stamp: float, now: float) -> bool:
+        return self._ttl > 0 and now - stamp >= self._ttl
+
+    def __getitem__(self, key: K) -> V:
+        stamp, value = self._data[key]
+        now = self._clock()
+        if self._expired(stamp, now) and not self._is_pinned(value):
+            del self._data[key]
+            raise KeyError(key)
+        self._data[key] = (now, value)
+        self._data.move_to_end(key)
+        return value
+
+    def __setitem__(self, key: K, value: V) -> None:
+        now = self._clock()
+        self._data[key] = (now, value)
+        self._data.move_to_end(key)
+        self._evict(now, keep=key)
+
+    def __delitem__(self, key: K) -> None:
+        del self._data[key]
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _evict(self, now: float, *, keep: K) -> None:
+        # Entries are ordered by last use, so the scan stops at the first entry
+        # that is neither expired nor needed to get back under maxsize.
+        overflow = len(self._data) - self._maxsize
+        doomed: list[K] = []
+        for key, (stamp, value) in self._data.items():
+            if key == keep or (overflow <= 0 and not self._expired(stamp, now)):
+                break
+            if self._is_pinned(value):
+                continue
+            doomed.append(key)
+            overflow -= 1
+        for key in doomed:
+            del self._data[key]
@@ -1,15 +1,19 @@
 from __future__ import annotations
 
-import json
+import functools
+import importlib.util
 import time
-from collections import deque
-from collections.abc import Mapping
+from collections.abc import Awaitable, Callable, Mapping, Sequence
 from dataclasses import dataclass, field
-from typing import Any, Final
+from typing import Any, Final, TypeVar
 
 import anyio
 import httpx
+from anyio.abc import TaskGroup
+from takopi.logging import get_logger
 
+from . import jsonutil
+from .cache import TTLCache
 from .types import (
     LinearAgentActivity,
     LinearAgentSession,
@@ -21,41 +25,205 @@ from .types import (
 
 DEFAULT_API_URL: Final[str] = "https://api.linear.app/graphql"
 
+logger = get_logger(__name__)
+
+_T = TypeVar("_T")
+
+
+@functools.lru_cache(maxsize=64)
+def _body_prefix(query: str, operation_name: str | None) -> bytes:
+    # The request body up to the variables value: {"query":...,"variables":
+    head: dict[str, Any] = {"query": query}
+    if operation_name is not None:
+        head["operationName"] = operation_name
+    return jsonutil.dumps(head)[:-1] + b',"variables":'
+
+
+def _as_dict(mapping: Mapping[str, Any] | None) -> dict[str, Any]:
+    if type(mapping) is dict:
+        return mapping
+    return dict(mapping or {})
+
+
+# Seconds a read result is reused. Concurrent identical reads always share one
+# request; the TTL additionally absorbs back-to-back repeats within one event.
+_VIEWER_TTL_S: Final[float] = 2.0
+_ISSUE_TTL_S: Final[float] = 2.0
+# A team's workflow states change only when someone edits the team's workflow.
+_WORKFLOW_STATES_TTL_S: Final[float] = 300.0
+
+# Queued (async_mode) activities; a full queue makes callers send inline instead.
+_ACTIVITY_QUEUE_SIZE: Final[int] = 256
+# How long aclose() waits for queued activities to be sent.
+_ACTIVITY_DRAIN_TIMEOUT_S: Final[float] = 5.0
+
+
+def _compact(query: str) -> str:
+    # GraphQL ignores insignificant whitespace; don't send the indentation.
+    return " ".join(query.split())
+
+
+_VIEWER_QUERY: Final[str] = _compact(
+    """
+    query Me {
+      viewer {
+        id
+        name
+        email
+      }
+    }
+    """
+)
+
+_ISSUE_QUERY: Final[str] = _compact(
+    """
+    query Issue($id: String!) {
+      issue(id: $id) {
+        id
+        title
+        identifier
+        url
+        team { id key name }
+        project { id name }
+        state { id name type }
+      }
+    }
+    """
+)
+
+_AGENT_ACTIVITY_QUERY: Final[str] = _compact(
+    """
+    query AgentActivity($id: String!) {
+      agentActivity(id: $id) {
+        id
+        content {
+          __typename
+          ... on AgentActivityThoughtContent { body }
+          ... on AgentActivityPromptContent { body }
+          ... on AgentActivityElicitationContent { body }
+          ... on AgentActivityResponseContent { body }
+          ... on AgentActivityErrorContent { body }
+          ... on AgentActivityActionContent { action parameter result }
+        }
+      }
+    }
+    """
+)
+
+_ISSUE_UPDATE_MUTATION: Final[str] = _compact(
+    """
+    mutation IssueUpdate($id: String!, $input: IssueUpdateInput!) {
+      issueUpdate(id: $id, input: $input) {
+        success
+        issue {
+          id
+          title
+          identifier
+          url
+          team { id key name }
+          project { id name }
+          state { id name type }
+        }
+      }
+    }
+    """
+)
+
+_WORKFLOW_STATES_QUERY: Final[str] = _compact(
+    """
+    query WorkflowStates($teamId: ID!) {
+      workflowStates(filter: { team: { id: { eq: $teamId } } }) {
+        nodes {
+          id
+          name
+          type
+        }
+      }
+    }
+    """
+)
+
+_AGENT_ACTIVITY_CREATE_MUTATION: Final[str] = _compact(
+    """
+    mutation AgentActivityCreate($input: AgentActivityCreateInput!) {
+      agentActivityCreate(input: $input) {
+        success
+        agentActivity {
+          id
+        }
+      }
+    }
+    """
+)
+
+_AGENT_SESSION_UPDATE_MUTATION: Final[str] = _compact(
+    """
+    mutation AgentSessionUpdate($agentSessionId: String!, $data: AgentSessionUpdateInput!) {
+      agentSessionUpdate(id: $agentSessionId, input: $data) {
+        success
+        agentSession {
+          id
+        }
+      }
+    }
+    """
+)
+
 
 class LinearApiError(RuntimeError):
     pass
 
 
+def _expect(data: Mapping[str, Any], key: str, message: str) -> dict[str, Any]:
+    value = data.get(key)
+    if type(value) is not dict:
+        raise LinearApiError(message)
+    return value
+
+
+def _expect_success(data: Mapping[str, Any], key: str, message: str) -> dict[str, Any]:
+    # Mutation payloads: {"success": bool, ...}
+    payload = data.get(key)
+    if type(payload) is not dict or not payload.get("success"):
+        raise LinearApiError(f"{message}: {payload!r}")
+    return payload
+
+
 @dataclass(slots=True)
 class _RateLimiter:
     max_requests: int
     window_s: float
     clock: Any = time.monotonic
     _lock: Any = field(init=False, repr=False)
-    _events: deque[float] = field(init=False, repr=False, default_factory=deque)
+    # Admission times of the last max_requests calls; _next is the oldest one.
+    _ring: list[float] = field(init=False, repr=False)
+    _next: int = field(init=False, repr=False, default=0)
 
     def __post_init__(self) -> None:
-        self._lock = anyio.Lock()
+        self._lock = anyio.Lock(fast_acquire=True)
+        self._ring = [float("-inf")] * max(0, self.max_requests)
 
     async def acquire(self) -> None:
         if self.max_requests <= 0:
             return
         async with self._lock:
-            now = float(self.clock())
-            cutoff = now - float(self.window_s)
-            while self._events and self._events[0] <= cutoff:
-                self._events.popleft()
-            if len(self._events) < self.max_requests:
-                self._events.append(now)
-                return
-            sleep_for = (self._events[0] + float(self.window_s)) - now
+            # The call max_requests ago must have left the window before this one runs.
+            sleep_for = (self._ring[self._next] + float(self.window_s)) - float(self.clock())
             if sleep_for > 0:
                 await anyio.sleep(sleep_for)
-            now = float(self.clock())
-            cutoff = now - float(self.window_s)
-            while self._events and self._events[0] <= cutoff:
-                self._events.popleft()
-            self._events.append(now)
+            self._ring[self._next] = float(self.clock())
+            self._next = (self._next + 1) % self.max_requests
+
+
+# HTTP/2 needs the optional `h2` package (`httpx[http2]`); without it httpx would
+# refuse http2=True, so fall back to pooled HTTP/1.1 keep-alive connections.
+_HTTP2_AVAILABLE: Final[bool] = importlib.util.find_spec("h2") is not None
+
+_DEFAULT_HTTP_LIMITS: Final[httpx.Limits] = httpx.Limits(
+    max_connections=64,
+    max_keepalive_connections=32,
+    keepalive_expiry=30.0,
+)
 
 
 class LinearClient:
@@ -66,18 +234,48 @@ class LinearClient:
         api_url: str = DEFAULT_API_URL,
         http: httpx.AsyncClient | None = None,
         rate_limit_per_hour: int = 500,
+        limits: httpx.Limits | None = None,
+        http2: bool | None = None,
     ) -> None:
         self._api_url = api_url
         self._token = oauth_token
         self._own_http = http is None
-        self._http = http or httpx.AsyncClient(timeout=httpx.Timeout(30.0))
-        if "Authorization" not in self._http.headers:
-            self._http.headers["Authorization"] = f"Bearer {oauth_token}"
-        if "Content-Type" not in self._http.headers:
-            self._http.headers["Content-Type"] = "application/json"
+        headers = {
+            "Authorization": f"Bearer {oauth_token}",
+            "Content-Type": "application/json",
+        }
+        # limits/http2 only apply to the client we own; http2=None means "if h2 is
+        # installed". An injected client keeps its own headers where set.
+        if http is None:
+            self._http = httpx.AsyncClient(
+                timeout=httpx.Timeout(30.0),
+                limits=limits or _DEFAULT_HTTP_LIMITS,
+                http2=_HTTP2_AVAILABLE if http2 is None else http2,
+                headers=headers,
+            )
+        else:
+            self._http = http
+            for name, value in headers.items():
+                if name not in http.headers:
+                    http.headers[name] = value
         self._rate = _RateLimiter(max_requests=rate_limit_per_hour, window_s=3600.0)
+        # Read results as (expires_at, value); the cache itself only bounds the size.
+        self._reads: TTLCache[tuple[str, str], tuple[float, Any]] = TTLCache(maxsize=256, ttl=0)
+        self._inflight: dict[tuple[str, str], anyio.Event] = {}
+        # async_mode activities, sent in call order by the worker that
+        # start_activity_worker() runs; _queued counts those not yet sent.
+        self._activity_tx, self._activity_rx = anyio.create_memory_object_stream[
+            dict[str, Any]
+        ](max_buffer_size=_ACTIVITY_QUEUE_SIZE)
+        self._activity_worker = False
+        self._queued = 0
+        self._drained: anyio.Event | None = None
 
     async def aclose(self) -> None:
+        self._activity_tx.close()
+        if self._queued and self._drained is not None:
+            with anyio.move_on_after(_ACTIVITY_DRAIN_TIMEOUT_S, shield=True):
+                await self._drained.wait()
         if self._own_http:
             await self._http.aclose()
 
@@ -89,139 +287,114 @@ class LinearClient:
         operation_name: str | None = None,
     ) -> dict[str, Any]:
         await self._rate.acquire()
-        payload: dict[str, Any] = {"query": query, "variables": dict(variables or {})}
-        if operation_name is not None:
-            payload["operationName"] = operation_name
+        # Only the variables change between calls of one operation; the query and
+        # name are serialized once per operation. Dict variables are passed as-is
+        # because they are serialized straight away and never mutated.
+        body = _body_prefix(query, operation_name) + jsonutil.dumps(_as_dict(variables)) + b"}"
         try:
-            resp = await self._http.post(self._api_url, content=json.dumps(payload))
+            resp = await self._http.post(self._api_url, content=body)
         except httpx.HTTPError as exc:
             raise LinearApiError(f"Linear request failed: {exc}") from exc
-        if resp.status_code >= 400:
-            body = resp.text.strip()
-            raise LinearApiError(
-                f"Linear API HTTP {resp.status_code}: {body or '<empty>'}"
-            )
+        status = resp.status_code
+        if status >= 400:
+            text = resp.text.strip()
+            raise LinearApiError(f"Linear API HTTP {status}: {text or '<empty>'}")
         try:
-            data = resp.json()
+            data = jsonutil.loads(resp.content)
         except ValueError as exc:
             raise LinearApiError(f"Linear API returned invalid JSON: {resp.text}") from exc
-        if not isinstance(data, dict):
+        # Decoded JSON objects are plain dicts, so exact type checks suffice; the
+        # happy path is one branch and the error cases are sorted out after it.
+        if type(data) is not dict:
             raise LinearApiError(f"Linear API returned invalid payload: {data!r}")
         errors = data.get("errors")
+        result = data.get("data")
+        if not errors and type(result) is dict:
+            return result
         if errors:
             raise LinearApiError(f"Linear GraphQL error: {errors!r}")
-        result = data.get("data")
-        if not isinstance(result, dict):
-            raise LinearApiError(f"Linear API returned no data: {data!r}")
-        return result
+        raise LinearApiError(f"Linear API returned no data: {data!r}")
+
+    async def _coalesced(
+        self, key: tuple[str, str], ttl: float, fetch: Callable[[], Awaitable[_T]]
+    ) -> _T:
+        # Callers share the returned object and must not mutate it.
+        while True:
+            cached = self._reads.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                return cached[1]
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            # After the leader finishes, either its result is cached or it failed
+            # and the next waiter fetches on its own.
+            await pending.wait()
+        done = self._inflight[key] = anyio.Event()
+        try:
+            value = await fetch()
+            self._reads[key] = (time.monotonic() + ttl, value)
+            return value
+        finally:
+            del self._inflight[key]
+            done.set()
+
+    def clear_workflow_cache(self, team_id: str | None = None) -> None:
+        """Forget cached workflow states for ``team_id``, or for every team."""
+        if team_id is not None:
+            self._reads.pop(("WorkflowStates", team_id), None)
+            return
+        for key in [key for key in self._reads if key[0] == "WorkflowStates"]:
+            del self._reads[key]
 
     async def get_viewer(self) -> LinearUser:
-        query = """
-        query Me {
-          viewer {
-            id
-            name
-            email
-          }
-        }
-        """
-        data = await self.graphql(query, operation_name="Me")
-        viewer = data.get("viewer")
-        if not isinstance(viewer, dict):
-            raise LinearApiError("Missing viewer in response")
-        return viewer  # type: ignore[return-value]
+        return await self._coalesced(("Me", ""), _VIEWER_TTL_S, self._fetch_viewer)
+
+    async def _fetch_viewer(self) -> LinearUser:
+        data = await self.graphql(_VIEWER_QUERY, operation_name="Me")
+        return _expect(data, "viewer", "Missing viewer in response")  # type: ignore[return-value]
 
     async def get_issue(self, issue_id: str) -> LinearIssue:
-        query = """
-        query Issue($id: String!) {
-          issue(id: $id) {
-            id
-            title
-            identifier
-            url
-            team { id key name }
-            project { id name }
-            state { id name type }
-          }
-        }
-        """
-        data = await self.graphql(query, variables={"id": issue_id}, operation_name="Issue")
-        issue = data.get("issue")
-        if not isinstance(issue, dict):
-            raise LinearApiError("Missing issue in response")
-        return issue  # type: ignore[return-value]
+        return await self._coalesced(
+            ("Issue", issue_id), _ISSUE_TTL_S, lambda: self._fetch_issue(issue_id)
+        )
+
+    async def _fetch_issue(self, issue_id: str) -> LinearIssue:
+        data = await self.graphql(_ISSUE_QUERY, variables={"id": issue_id}, operation_name="Issue")
+        return _expect(data, "issue", "Missing issue in response")  # type: ignore[return-value]
 
     async def get_agent_activity(self, activity_id: str) -> LinearAgentActivity:
-        query = """
-        query AgentActivity($id: String!) {
-          agentActivity(id: $id) {
-            id
-            content {
-              __typename
-              ... on AgentActivityThoughtContent { body }
-              ... on AgentActivityPromptContent { body }
-              ... on AgentActivityElicitationContent { body }
-              ... on AgentActivityResponseContent { body }
-              ... on AgentActivityErrorContent { body }
-              ... on AgentActivityActionContent { action parameter result }
-            }
-          }
-        }
-        """
         data = await self.graphql(
-            query,
+            _AGENT_ACTIVITY_QUERY,
             variables={"id": activity_id},
             operation_name="AgentActivity",
         )
-        activity = data.get("agentActivity")
-        if not isinstance(activity, dict):
-            raise LinearApiError("Missing agentActivity in response")
+        activity = _expect(data, "agentActivity", "Missing agentActivity in response")
         return activity  # type: ignore[return-value]
 
     async def update_issue(self, issue_id: str, **fields: Any) -> LinearIssue:
-        query = """
-        mutation IssueUpdate($id: String!, $input: IssueUpdateInput!) {
-          issueUpdate(id: $id, input: $input) {
-            success
-            issue {
-              id
-              title
-              identifier
-              url
-              team { id key name }
-              project { id name }
-              state { id name type }
-            }
-          }
-        }
-        """
-        data = await self.graphql(
-            query,
-            variables={"id": issue_id, "input": fields},
-            operation_name="IssueUpdate",
-        )
-        payload = data.get("issueUpdate")
-        if not isinstance(payload, dict) or not payload.get("success"):
-            raise LinearApiError(f"Issue update failed: {payload!r}")
-        issue = payload.get("issue")
-        if not isinstance(issue, dict):
-            raise LinearApiError("Missing updated issue in response")
+        try:
+            data = await self.graphql(
+                _ISSUE_UPDATE_MUTATION,
+                variables={"id": issue_id, "input": fields},
+                operation_name="IssueUpdate",
+            )
+        finally:
+            # Even a failed request may have applied; don't serve the old issue.
+            self._reads.pop(("Issue", issue_id), None)
+        payload = _expect_success(data, "issueUpdate", "Issue update failed")
+        issue = _expect(payload, "issue", "Missing updated issue in response")
         return issue  # type: ignore[return-value]
 
     async def get_workflow_states(self, team_id: str) -> list[LinearWorkflowState]:
-        query = """
-        query WorkflowStates($teamId: ID!) {
-          workflowStates(filter: { team: { id: { eq: $teamId } } }) {
-            nodes {
-              id
-              name
-              type
-            }
-          }
-        }
-        """
+        return await self._coalesced(
+            ("WorkflowStates", team_id),
+            _WORKFLOW_STATES_TTL_S,
+            lambda: self._fetch_workflow_states(team_id),
+        )
+
+    async def _fetch_workflow_states(self, team_id: str) -> list[LinearWorkflowState]:
         data = await self.graphql(
-            query,
+            _WORKFLOW_STATES_QUERY,
             variables={"teamId": team_id},
             operation_name="WorkflowStates",
         )
@@ -233,40 +406,79 @@ class LinearClient:
             return []
         return [node for node in nodes if isinstance(node, dict)]  # type: ignore[return-value]
 
+    def start_activity_worker(self, task_group: TaskGroup) -> None:
+        """Send ``async_mode`` activities from a worker in ``task_group``.
+
+        Until this is called, ``async_mode`` activities are sent inline.
+        """
+        if not self._activity_worker:
+            self._activity_worker = True
+            task_group.start_soon(self._drain_activities)
+
+    async def _drain_activities(self) -> None:
+        try:
+            async for variables in self._activity_rx:
+                try:
+                    await self._send_activity(variables)
+                except Exception as exc:
+                    logger.warning(
+                        "activity.send_failed",
+                        error=str(exc),
+                        error_type=exc.__class__.__name__,
+                    )
+                self._queued -= 1
+                if not self._queued and self._drained is not None:
+                    self._drained.set()
+        finally:
+            # Anything still queued is lost; don't leave inline senders waiting on it.
+            self._activity_worker = False
+            self._queued = 0
+            if self._drained is not None:
+                self._drained.set()
+
     async def create_agent_activity(
         self,
         *,
         session_id: str,
         content: Mapping[str, Any],
         ephemeral: bool | None = None,
+        async_mode: bool = False,
     ) -> LinearAgentActivity:
-        query = """
-        mutation AgentActivityCreate($input: AgentActivityCreateInput!) {
-          agentActivityCreate(input: $input) {
-            success
-            agentActivity {
-              id
-            }
-          }
-        }
+        """Create an agent activity and return it.
+
+        With ``async_mode`` the activity is queued for the worker and an empty
+        activity is returned at once; failures are logged rather than raised.
+        Inline sends wait for queued activities first, so call order is kept.
         """
         input_payload: dict[str, Any] = {
             "agentSessionId": session_id,
-            "content": dict(content),
+            "content": _as_dict(content),
         }
         if ephemeral is not None:
             input_payload["ephemeral"] = bool(ephemeral)
+        variables = {"input": input_payload}
+        if async_mode and self._activity_worker:
+            try:
+                self._activity_tx.send_nowait(variables)
+            except (anyio.WouldBlock, anyio.ClosedResourceError):
+                pass
+            else:
+                if not self._queued:
+                    self._drained = anyio.Event()
+                self._queued += 1
+                return {}
+        while self._queued and self._drained is not None:
+            await self._drained.wait()
+        return await self._send_activity(variables)
+
+    async def _send_activity(self, variables: dict[str, Any]) -> LinearAgentActivity:
         data = await self.graphql(
-            query,
-            variables={"input": input_payload},
+            _AGENT_ACTIVITY_CREATE_MUTATION,
+            variables=variables,
             operation_name="AgentActivityCreate",
         )
-        payload = data.get("agentActivityCreate")
-        if not isinstance(payload, dict) or not payload.get("success"):
-            raise LinearApiError(f"Agent activity create failed: {payload!r}")
-        activity = payload.get("agentActivity")
-        if not isinstance(activity, dict):
-            raise LinearApiError("Missing agentActivity in response")
+        payload = _expect_success(data, "agentActivityCreate", "Agent activity create failed")
+        activity = _expect(payload, "agentActivity", "Missing agentActivity in response")
         return activity  # type: ignore[return-value]
 
     async def update_agent_session(
@@ -275,28 +487,16 @@ class LinearClient:
         session_id: str,
         data: Mapping[str, Any],
     ) -> LinearAgentSession:
-        query = """
-        mutation AgentSessionUpdate($agentSessionId: String!, $data: AgentSessionUpdateInput!) {
-          agentSessionUpdate(id: $agentSessionId, input: $data) {
-            success
-            agentSession {
-              id
-            }
-          }
-        }
-        """
         result = await self.graphql(
-            query,
-            variables={"agentSessionId": session_id, "data": dict(data)},
+            _AGENT_SESSION_UPDATE_MUTATION,
+            variables={"agentSessionId": session_id, "data": _as_dict(data)},
             operation_name="AgentSessionUpdate",
         )
-        payload = result.get("agentSessionUpdate")
-        if not isinstance(payload, dict) or not payload.get("success"):
-            raise LinearApiError(f"Agent session update failed: {payload!r}")
+        payload = _expect_success(result, "agentSessionUpdate", "Agent session update failed")
         session = payload.get("agentSession")
         if not isinstance(session, dict):
             return {"id": session_id}  # type: ignore[return-value]
         return session  # type: ignore[return-value]
 
-    async def set_agent_plan(self, *, session_id: str, steps: list[PlanStep]) -> None:
+    async def set_agent_plan(self, *, session_id: str, steps: Sequence[PlanStep]) -> None:
         await self.update_agent_session(session_id=session_id, data={"plan": steps})
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Callable
+from typing import Any
+
+try:
+    import orjson  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers can keep
+# catching the stdlib exception whichever decoder is active.
+loads: Callable[[str | bytes | bytearray], Any] = json.loads if orjson is None else orjson.loads
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+# Compact UTF-8 bytes, the same shape orjson.dumps produces.
+dumps: Callable[[Any], bytes] = _stdlib_dumps if orjson is None else orjson.dumps
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
-from collections.abc import Callable
-import json
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from contextlib import asynccontextmanager
 from typing import Any, cast
 
 import anyio
+from takopi.logging import get_logger
 
+from . import jsonutil
 from .types import GatewayEvent
 
+logger = get_logger(__name__)
+
 
 def _require_psycopg() -> tuple[Any, Any]:
     try:
@@ -16,11 +20,32 @@ def _require_psycopg() -> tuple[Any, Any]:
     except ImportError as exc:  # pragma: no cover
         raise RuntimeError(
             "psycopg is required to poll the kai-gateway database; install "
-            "`takopi-linear` with psycopg[binary]."
+            "`takopi-linear` with psycopg[binary,pool]."
         ) from exc
     return psycopg, dict_row
 
 
+def _require_psycopg_pool() -> Any:
+    try:
+        from psycopg_pool import AsyncConnectionPool  # type: ignore[import-not-found]
+    except ImportError as exc:  # pragma: no cover
+        raise RuntimeError(
+            "psycopg_pool is required to poll the kai-gateway database; install "
+            "`takopi-linear` with psycopg[binary,pool]."
+        ) from exc
+    return AsyncConnectionPool
+
+
+async def _configure_connection(conn: Any) -> None:
+    # AsyncConnectionPool awaits its configure callback.
+    if jsonutil.orjson is not None:
+        from psycopg.types.json import set_json_loads  # type: ignore[import-not-found]
+
+        # Scoped to this connection so other psycopg users in the process keep
+        # their own json/jsonb loaders.
+        set_json_loads(jsonutil.loads, conn)
+
+
 _CLAIM_SQL = """
 UPDATE events
 SET status = 'processing', processed_at = now()
@@ -43,6 +68,34 @@ WHERE id = %s
 """
 
 
+def _as_str(value: Any) -> str:
+    # ids come back as str or uuid.UUID depending on the column type.
+    return value if type(value) is str else str(value)
+
+
+def _event_from_row(row: dict[str, Any]) -> GatewayEvent:
+    payload = row.get("payload")
+    if type(payload) is not dict:
+        # jsonb arrives decoded; json/text columns arrive as str or bytes. Both
+        # decoders take bytes directly, and invalid UTF-8 or JSON is a ValueError.
+        if isinstance(payload, (str, bytes, bytearray)):
+            try:
+                payload = jsonutil.loads(payload)
+            except ValueError:
+                payload = {}
+        if not isinstance(payload, dict):
+            payload = {}
+    external_id = row.get("external_id")
+    return GatewayEvent(
+        id=_as_str(row.get("id", "")),
+        source=_as_str(row.get("source", "")),
+        event_type=_as_str(row.get("event_type", "")),
+        external_id=_as_str(external_id) if external_id else None,
+        payload=payload,
+        created_at=row.get("created_at"),
+    )
+
+
 class GatewayPoller:
     def __init__(
         self,
@@ -52,29 +105,56 @@ class GatewayPoller:
         batch_size: int = 10,
         sleep: Callable[[float], Any] = anyio.sleep,
         conn: Any | None = None,
+        notify_channel: str | None = None,
+        ack_batch_size: int = 64,
+        pool_min_size: int = 2,
+        pool_max_size: int = 8,
     ) -> None:
         self._database_url = database_url
         self._source = source
         self._batch_size = int(batch_size)
         self._sleep = sleep
-        self._lock = anyio.Lock()
+        # An injected connection (tests) is shared, so operations on it are
+        # serialized; otherwise each operation borrows one from the pool.
         self._conn: Any | None = conn
-        self._own_conn = conn is None
+        self._lock = anyio.Lock(fast_acquire=True)
+        self._pool: Any | None = None
+        self._pool_min_size = max(1, int(pool_min_size))
+        self._pool_max_size = max(self._pool_min_size, int(pool_max_size))
+        self._notify_channel = notify_channel or None
+        self._listen_conn: Any | None = None
+        # Write-behind acks, written by flush() in one transaction.
+        self._ack_batch_size = max(1, int(ack_batch_size))
+        self._done_buf: list[str] = []
+        self._failed_buf: list[tuple[str, str]] = []
 
     async def open(self) -> None:
-        if self._conn is not None:
+        if self._conn is not None or self._pool is not None:
             return
-        psycopg, dict_row = _require_psycopg()
-        self._conn = await psycopg.AsyncConnection.connect(
+        _, dict_row = _require_psycopg()
+        AsyncConnectionPool = _require_psycopg_pool()
+        pool = AsyncConnectionPool(
             self._database_url,
-            row_factory=dict_row,
+            min_size=self._pool_min_size,
+            max_size=self._pool_max_size,
+            # The same three statements run on every loop iteration: prepare them
+            # server-side on first use instead of after psycopg's default of five.
+            kwargs={"row_factory": dict_row, "prepare_threshold": 0},
+            configure=_configure_connection,
+            open=False,
         )
+        await pool.open()
+        self._pool = pool
 
     async def close(self) -> None:
-        if self._conn is None:
-            return
-        if self._own_conn:
-            await self._conn.close()
+        if self._done_buf or self._failed_buf:
+            # Don't drop buffered acks, even when closing because of cancellation.
+            with anyio.CancelScope(shield=True):
+                await self.flush()
+        await self._close_listen_conn()
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
         self._conn = None
 
     async def __aenter__(self) -> GatewayPoller:
@@ -84,61 +164,170 @@ class GatewayPoller:
     async def __aexit__(self, exc_type, exc, tb) -> None:
         await self.close()
 
+    @asynccontextmanager
+    async def _connection(self) -> AsyncIterator[Any]:
+        if self._conn is not None:
+            async with self._lock:
+                conn = self._conn
+                try:
+                    yield conn
+                except Exception:
+                    # Leave the shared connection usable: roll back the aborted
+                    # transaction before the next operation runs on it.
+                    try:
+                        await conn.rollback()
+                    except Exception:
+                        pass
+                    raise
+            return
+        if self._pool is None:
+            await self.open()
+        # The pool rolls back on error and replaces connections that died.
+        async with cast(Any, self._pool).connection() as conn:
+            yield conn
+
     async def poll(self) -> list[GatewayEvent]:
-        async with self._lock:
-            if self._conn is None:
-                await self.open()
-            conn = cast(Any, self._conn)
+        async with self._connection() as conn:
             async with conn.cursor() as cur:
                 await cur.execute(_CLAIM_SQL, (self._source, self._batch_size))
                 rows = await cur.fetchall()
             await conn.commit()
-        events: list[GatewayEvent] = []
-        for row in rows or []:
-            if not isinstance(row, dict):
-                continue
-            payload = row.get("payload")
-            if isinstance(payload, (bytes, bytearray)):
-                try:
-                    payload = payload.decode("utf-8")
-                except Exception:
-                    payload = {}
-            if isinstance(payload, str):
-                try:
-                    payload = json.loads(payload)
-                except json.JSONDecodeError:
-                    payload = {}
-            if not isinstance(payload, dict):
-                payload = {}
-            events.append(
-                GatewayEvent(
-                    id=str(row.get("id", "")),
-                    source=str(row.get("source", "")),
-                    event_type=str(row.get("event_type", "")),
-                    external_id=(str(row["external_id"]) if row.get("external_id") else None),
-                    payload=payload,
-                    created_at=row.get("created_at"),
-                )
-            )
-        return events
+        return [_event_from_row(row) for row in rows or () if isinstance(row, dict)]
 
     async def mark_done(self, event_id: str) -> None:
-        async with self._lock:
-            if self._conn is None:
-                await self.open()
-            conn = cast(Any, self._conn)
+        async with self._connection() as conn:
             async with conn.cursor() as cur:
                 await cur.execute(_DONE_SQL, (event_id,))
             await conn.commit()
 
     async def mark_failed(self, event_id: str, *, error: str) -> None:
-        async with self._lock:
-            if self._conn is None:
-                await self.open()
-            conn = cast(Any, self._conn)
+        async with self._connection() as conn:
             async with conn.cursor() as cur:
                 await cur.execute(_FAILED_SQL, (error, event_id))
             await conn.commit()
 
+    async def mark_done_batch(self, event_ids: Sequence[str]) -> None:
+        await self._write_acks(event_ids, ())
+
+    async def mark_failed_batch(self, items: Sequence[tuple[str, str]]) -> None:
+        await self._write_acks((), items)
+
+    async def ack_done(self, event_id: str) -> None:
+        """Buffer a done ack; written by the next ``flush()``."""
+        self._done_buf.append(event_id)
+        if len(self._done_buf) + len(self._failed_buf) >= self._ack_batch_size:
+            await self.flush()
+
+    async def ack_failed(self, event_id: str, *, error: str) -> None:
+        """Buffer a failed ack; written by the next ``flush()``."""
+        self._failed_buf.append((event_id, error))
+        if len(self._done_buf) + len(self._failed_buf) >= self._ack_batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write every buffered ack in a single transaction."""
+        done, self._done_buf = self._done_buf, []
+        failed, self._failed_buf = self._failed_buf, []
+        try:
+            await self._write_acks(done, failed)
+        except BaseException:
+            # Not written: put the acks back ahead of any buffered meanwhile, so
+            # the next flush retries them instead of leaving the events processing.
+            self._done_buf[:0] = done
+            self._failed_buf[:0] = failed
+            raise
+
+    async def _write_acks(
+        self, event_ids: Sequence[str], failed: Sequence[tuple[str, str]]
+    ) -> None:
+        if not event_ids and not failed:
+            return
+        async with self._connection() as conn:
+            async with conn.cursor() as cur:
+                if event_ids:
+                    await cur.executemany(_DONE_SQL, [(event_id,) for event_id in event_ids])
+                if failed:
+                    await cur.executemany(
+                        _FAILED_SQL, [(error, event_id) for event_id, error in failed]
+                    )
+            await conn.commit()
+
+    async def process_batch(
+        self,
+        events: Sequence[GatewayEvent],
+        handler: Callable[[GatewayEvent], Awaitable[object]],
+        *,
+        concurrency: int = 5,
+    ) -> None:
+        """Run ``handler`` over ``events``, at most ``concurrency`` at a time.
+
+        Each event is acked done when its handler returns and failed with the
+        exception text when it raises; acks go through the write-behind buffer.
+        """
+        limiter = anyio.Semaphore(max(1, int(concurrency)))
+
+        async def run(event: GatewayEvent) -> None:
+            async with limiter:
+                try:
+                    await handler(event)
+                except Exception as exc:
+                    await self.ack_failed(event.id, error=str(exc))
+                    return
+            await self.ack_done(event.id)
+
+        async with anyio.create_task_group() as tg:
+            for event in events:
+                tg.start_soon(run, event)
+
     async def sleep(self, seconds: float) -> None:
         await self._sleep(seconds)
+
+    async def wait_for_events(self, timeout: float) -> None:
+        """Return on the next NOTIFY on ``notify_channel``, or after ``timeout`` seconds.
+
+        Without a channel this is a plain sleep. The timeout doubles as a watchdog for
+        notifications missed between an empty poll and the wait.
+        """
+        if self._notify_channel is None:
+            await self._sleep(timeout)
+            return
+        try:
+            if self._listen_conn is None:
+                await self._listen()
+            conn = cast(Any, self._listen_conn)
+            async for _ in conn.notifies(timeout=timeout, stop_after=1):
+                pass
+        except Exception as exc:
+            # The LISTEN connection failed or dropped (e.g. a database restart):
+            # reconnect on the next wait and fall back to a plain sleep for this one.
+            logger.warning(
+                "gateway.listen_failed",
+                error=str(exc),
+                error_type=exc.__class__.__name__,
+            )
+            await self._close_listen_conn()
+            await self._sleep(timeout)
+
+    async def _close_listen_conn(self) -> None:
+        conn, self._listen_conn = self._listen_conn, None
+        if conn is not None:
+            try:
+                await conn.close()
+            except Exception:
+                pass
+
+    async def _listen(self) -> None:
+        psycopg, _ = _require_psycopg()
+        from psycopg import sql  # type: ignore[import-not-found]
+
+        channel = self._notify_channel
+        assert channel is not None
+        # LISTEN needs its own autocommit connection: the claim connection sits in
+        # transactions, and notifications are only delivered between them.
+        conn = await psycopg.AsyncConnection.connect(self._database_url, autocommit=True)
+        try:
+            await conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(channel)))
+        except BaseException:
+            await conn.close()
+            raise
+        self._listen_conn = conn
@@ -4,9 +4,11 @@ from typing import Literal
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator
 
+_POSTGRES_URL_PREFIXES = ("postgres://", "postgresql://", "postgresql+psycopg://")
+
 
 class LinearTransportSettings(BaseModel):
-    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True, frozen=True)
 
     oauth_token: str = Field(..., description="Linear OAuth access token (actor=app)")
     app_id: str = Field(..., description="Linear app id")
@@ -19,7 +21,37 @@ class LinearTransportSettings(BaseModel):
 
     source: str = Field(default="linear", description="Gateway events source filter")
     poll_interval: float = Field(default=5.0, ge=0.5)
+    poll_max_interval: float = Field(
+        default=60.0,
+        ge=0.5,
+        description="Cap for the idle/error poll backoff, which doubles from poll_interval",
+    )
+    notify_channel: str | None = Field(
+        default=None,
+        description=(
+            "Postgres channel the gateway NOTIFYs on insert; idle polls then wait for it, "
+            "with poll_interval as the fallback timeout"
+        ),
+    )
     poll_batch_size: int = Field(default=10, ge=1, le=100)
+    max_concurrent_events: int = Field(
+        default=16,
+        ge=1,
+        description="Gateway events processed concurrently (per-session order is kept)",
+    )
+
+    max_sessions: int = Field(default=1024, ge=1, description="Agent sessions kept in memory")
+    session_ttl: float = Field(
+        default=3600.0,
+        ge=0,
+        description="Seconds an idle agent session is kept in memory (0 disables expiry)",
+    )
+
+    debounce_ms: int = Field(
+        default=250,
+        ge=0,
+        description="Coalesce ephemeral progress updates within this window (0 disables)",
+    )
 
     message_overflow: Literal["trim", "split"] = "split"
     max_body_chars: int = Field(default=10_000, ge=500)
@@ -34,11 +66,7 @@ class LinearTransportSettings(BaseModel):
     @field_validator("gateway_database_url")
     @classmethod
     def _validate_gateway_db_url(cls, value: str) -> str:
-        if not (
-            value.startswith("postgres://")
-            or value.startswith("postgresql://")
-            or value.startswith("postgresql+psycopg://")
-        ):
+        if not value.startswith(_POSTGRES_URL_PREFIXES):
             raise ValueError("must be a postgres connection URL")
         return value
 
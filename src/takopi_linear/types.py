@@ -1,8 +1,7 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Literal, TypedDict
+from typing import Any, Literal, NamedTuple, TypedDict
 
 AgentActivityType = Literal["thought", "action", "elicitation", "response", "error"]
 PlanStepStatus = Literal["pending", "inProgress", "completed", "canceled"]
@@ -13,8 +12,7 @@ class PlanStep(TypedDict):
     status: PlanStepStatus
 
 
-@dataclass(frozen=True, slots=True)
-class GatewayEvent:
+class GatewayEvent(NamedTuple):
     id: str
     source: str
     event_type: str
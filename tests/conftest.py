@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import importlib.util
+from typing import Any
+
+import pytest
+from takopi.runner_bridge import ExecBridgeConfig
+from takopi.transport import MessageRef, RenderedMessage
+
+from takopi_linear.settings import LinearTransportSettings
+
+
+class FakeTransport:
+    def __init__(self) -> None:
+        self.sent: list[tuple[str, RenderedMessage]] = []
+
+    async def close(self) -> None:
+        return None
+
+    async def send(self, *, channel_id: str, message: RenderedMessage, options: Any | None = None):
+        _ = options
+        self.sent.append((str(channel_id), message))
+        return None
+
+    async def edit(self, *, ref: MessageRef, message: RenderedMessage, wait: bool = True):
+        _ = ref
+        _ = message
+        _ = wait
+        return None
+
+    async def delete(self, *, ref: MessageRef) -> bool:
+        _ = ref
+        return True
+
+
+class FakePresenter:
+    pass
+
+
+_PRESENTER = FakePresenter()
+
+
+# uvloop is optional (and unavailable on Windows); use it when it's installed.
+_USE_UVLOOP = importlib.util.find_spec("uvloop") is not None
+
+
+@pytest.fixture(scope="session")
+def anyio_backend() -> tuple[str, dict[str, Any]]:
+    # One backend and one event loop for the whole run.
+    return ("asyncio", {"use_uvloop": _USE_UVLOOP})
+
+
+@pytest.fixture(autouse=True)
+def _stub_handle_message(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> None:
+    # Handler tests stop at takopi's runner bridge; mark a test with
+    # real_handle_message to let it through.
+    if request.node.get_closest_marker("real_handle_message") is not None:
+        return
+
+    async def _noop(*args: Any, **kwargs: Any) -> None:
+        return None
+
+    monkeypatch.setattr("takopi_linear.backend.handle_message", _noop)
+
+
+@pytest.fixture(scope="session")
+def settings() -> LinearTransportSettings:
+    # The model is frozen, so a single validated instance can be shared.
+    return LinearTransportSettings(
+        oauth_token="token",
+        app_id="app",
+        gateway_database_url="postgresql://example",
+    )
+
+
+@pytest.fixture
+def transport() -> FakeTransport:
+    # Per test: tests assert on what was sent.
+    return FakeTransport()
+
+
+@pytest.fixture
+def exec_cfg(transport: FakeTransport) -> ExecBridgeConfig:
+    return ExecBridgeConfig(transport=transport, presenter=_PRESENTER, final_notify=False)
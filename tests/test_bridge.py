@@ -1,8 +1,10 @@
 from __future__ import annotations
 
-from takopi.transport import RenderedMessage
+import anyio
+import pytest
+from takopi.transport import MessageRef, RenderedMessage
 
-from takopi_linear.bridge import _activity_from_message
+from takopi_linear.bridge import LinearTransport, _activity_from_message
 
 
 def test_renders_thought_activity_content() -> None:
@@ -54,3 +56,106 @@ def test_renders_action_activity_content_fallback() -> None:
     assert spec.content == {"type": "action", "action": "message", "parameter": "ping"}
     assert spec.ephemeral is True
 
+
+class _RecordingClient:
+    def __init__(self) -> None:
+        self.created: list[dict[str, object]] = []
+
+    async def create_agent_activity(self, *, session_id, content, ephemeral=None, async_mode=False):
+        self.created.append({"session_id": session_id, "content": content, "ephemeral": ephemeral})
+        return {"id": f"act_{len(self.created)}"}
+
+
+@pytest.mark.anyio
+async def test_edit_skips_unchanged_ephemeral_frames() -> None:
+    client = _RecordingClient()
+    transport = LinearTransport(client)  # type: ignore[arg-type]
+    frame = RenderedMessage(text="working", extra={"activity_type": "thought", "ephemeral": True})
+    ref = await transport.send(channel_id="sess_1", message=frame)
+    assert ref is not None
+
+    assert await transport.edit(ref=ref, message=frame) is ref
+    assert len(client.created) == 1
+
+    changed = RenderedMessage(text="working 1s", extra={"activity_type": "thought", "ephemeral": True})
+    await transport.edit(ref=ref, message=changed)
+    await transport.edit(ref=ref, message=RenderedMessage(text="done", extra={"activity_type": "response"}))
+    await transport.edit(ref=ref, message=changed)
+    assert len(client.created) == 4
+
+
+@pytest.mark.anyio
+async def test_last_ephemeral_frames_are_bounded_and_cleared(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("takopi_linear.bridge._LAST_EPHEMERAL_MAXSIZE", 2)
+    transport = LinearTransport(_RecordingClient())  # type: ignore[arg-type]
+    frame = RenderedMessage(text="working", extra={"activity_type": "thought", "ephemeral": True})
+    for session_id in ("s1", "s2", "s3"):
+        await transport.send(channel_id=session_id, message=frame)
+    assert sorted(transport._last_ephemeral) == ["s2", "s3"]
+
+    await transport.send(channel_id="s3", message=RenderedMessage(text="done", extra={"activity_type": "response"}))
+    assert sorted(transport._last_ephemeral) == ["s2"]
+
+
+@pytest.mark.anyio
+async def test_edit_debounces_ephemeral_thoughts() -> None:
+    client = _RecordingClient()
+    transport = LinearTransport(client, debounce_s=0.05)  # type: ignore[arg-type]
+
+    def frame(text: str) -> RenderedMessage:
+        return RenderedMessage(text=text, extra={"activity_type": "thought", "ephemeral": True})
+
+    async with anyio.create_task_group() as tg:
+        transport.bind_task_group(tg)
+        ref = await transport.send(channel_id="sess_1", message=frame("step 0"))
+        assert ref is not None
+        for i in range(1, 4):
+            await transport.edit(ref=ref, message=frame(f"step {i}"))
+        assert len(client.created) == 1
+        await anyio.sleep(0.1)
+        assert [item["content"] for item in client.created][-1] == {"type": "thought", "body": "step 3"}
+        assert len(client.created) == 2
+
+        await transport.edit(ref=ref, message=frame("stale"))
+        await transport.edit(ref=ref, message=RenderedMessage(text="done", extra={"activity_type": "response"}))
+        await anyio.sleep(0.1)
+
+    assert [item["content"]["body"] for item in client.created] == ["step 0", "step 3", "done"]
+
+
+class _SlowClient(_RecordingClient):
+    def __init__(self, delay: float) -> None:
+        super().__init__()
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create_agent_activity(self, *, session_id, content, ephemeral=None, async_mode=False):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await anyio.sleep(self.delay)
+            return await super().create_agent_activity(
+                session_id=session_id, content=content, ephemeral=ephemeral
+            )
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.mark.anyio
+async def test_debounced_flushes_of_a_session_do_not_overlap() -> None:
+    client = _SlowClient(delay=0.2)
+    transport = LinearTransport(client, debounce_s=0.05)  # type: ignore[arg-type]
+    ref = MessageRef(channel_id="s", message_id="m")
+
+    def frame(text: str) -> RenderedMessage:
+        return RenderedMessage(text=text, extra={"activity_type": "thought", "ephemeral": True})
+
+    async with anyio.create_task_group() as tg:
+        transport.bind_task_group(tg)
+        await transport.edit(ref=ref, message=frame("one"))
+        await anyio.sleep(0.08)
+        await transport.edit(ref=ref, message=frame("two"))
+
+    assert [item["content"]["body"] for item in client.created] == ["one", "two"]
+    assert client.max_in_flight == 1
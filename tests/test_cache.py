@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from takopi_linear.cache import TTLCache
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_cache_evicts_least_recently_used() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=0)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache["a"] == 1
+    cache["c"] = 3
+    assert set(cache) == {"a", "c"}
+
+
+def test_ttl_cache_expires_idle_entries() -> None:
+    clock = _Clock()
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=5.0, clock=clock)
+    cache["a"] = 1
+    clock.now = 4.0
+    assert cache.get("a") == 1
+    clock.now = 8.0
+    assert cache.get("a") == 1
+    clock.now = 13.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_keeps_pinned_entries() -> None:
+    clock = _Clock()
+    busy = {"a"}
+    cache: TTLCache[str, str] = TTLCache(
+        maxsize=1, ttl=5.0, clock=clock, pinned=lambda value: value in busy
+    )
+    cache["a"] = "a"
+    cache["b"] = "b"
+    assert set(cache) == {"a", "b"}
+    clock.now = 10.0
+    assert cache.get("a") == "a"
+    busy.clear()
+    cache["c"] = "c"
+    assert set(cache) == {"c"}
@@ -2,9 +2,11 @@ from __future__ import annotations
 
 import json
 
+import anyio
 import httpx
 import pytest
 
+from takopi_linear import client as client_module
 from takopi_linear.client import LinearClient
 
 
@@ -31,6 +33,28 @@ async def test_get_viewer_sends_auth_header() -> None:
         await http.aclose()
 
 
+@pytest.mark.anyio
+async def test_owned_http_client_uses_default_limits(monkeypatch: pytest.MonkeyPatch) -> None:
+    seen: dict[str, object] = {}
+    real_client = httpx.AsyncClient
+
+    def fake_client(**kwargs: object) -> httpx.AsyncClient:
+        seen.update(kwargs)
+        return real_client(**kwargs)  # type: ignore[arg-type]
+
+    monkeypatch.setattr(httpx, "AsyncClient", fake_client)
+    client = LinearClient("test-token")
+    try:
+        assert seen["limits"] is client_module._DEFAULT_HTTP_LIMITS
+        assert seen["http2"] is client_module._HTTP2_AVAILABLE
+        assert seen["headers"] == {
+            "Authorization": "Bearer test-token",
+            "Content-Type": "application/json",
+        }
+    finally:
+        await client.aclose()
+
+
 @pytest.mark.anyio
 async def test_create_agent_activity_includes_content_and_ephemeral() -> None:
     seen: dict[str, object] = {}
@@ -136,3 +160,111 @@ async def test_set_agent_plan_uses_agent_session_update() -> None:
         )
     finally:
         await http.aclose()
+
+
+@pytest.mark.anyio
+async def test_issue_reads_are_coalesced_until_an_update() -> None:
+    operations: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content.decode("utf-8"))
+        operations.append(body["operationName"])
+        if body["operationName"] == "IssueUpdate":
+            return httpx.Response(
+                200,
+                json={"data": {"issueUpdate": {"success": True, "issue": {"id": "i1"}}}},
+            )
+        return httpx.Response(200, json={"data": {"issue": {"id": "i1", "title": "T"}}})
+
+    transport = httpx.MockTransport(handler)
+    http = httpx.AsyncClient(transport=transport)
+    client = LinearClient("t", api_url="https://linear.test/graphql", http=http)
+    try:
+        results: list[object] = []
+
+        async def read() -> None:
+            results.append(await client.get_issue("i1"))
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(read)
+            tg.start_soon(read)
+        await client.get_issue("i1")
+        assert operations == ["Issue"]
+        assert results[0] is results[1]
+
+        await client.update_issue("i1", title="U")
+        await client.get_issue("i1")
+        assert operations == ["Issue", "IssueUpdate", "Issue"]
+    finally:
+        await http.aclose()
+
+
+@pytest.mark.anyio
+async def test_workflow_states_are_cached_per_team_until_cleared() -> None:
+    teams: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content.decode("utf-8"))
+        teams.append(body["variables"]["teamId"])
+        return httpx.Response(
+            200,
+            json={"data": {"workflowStates": {"nodes": [{"id": "s1", "type": "started"}]}}},
+        )
+
+    transport = httpx.MockTransport(handler)
+    http = httpx.AsyncClient(transport=transport)
+    client = LinearClient("t", api_url="https://linear.test/graphql", http=http)
+    try:
+        await client.get_workflow_states("t1")
+        await client.get_workflow_states("t1")
+        await client.get_workflow_states("t2")
+        assert teams == ["t1", "t2"]
+        client.clear_workflow_cache("t1")
+        await client.get_workflow_states("t1")
+        await client.get_workflow_states("t2")
+        client.clear_workflow_cache()
+        await client.get_workflow_states("t2")
+        assert teams == ["t1", "t2", "t1", "t2"]
+    finally:
+        await http.aclose()
+
+
+@pytest.mark.anyio
+async def test_async_mode_activities_are_queued_and_sent_in_order() -> None:
+    bodies: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content.decode("utf-8"))
+        bodies.append(body["variables"]["input"]["content"]["body"])
+        return httpx.Response(
+            200,
+            json={
+                "data": {
+                    "agentActivityCreate": {
+                        "success": True,
+                        "agentActivity": {"id": f"a{len(bodies)}"},
+                    }
+                }
+            },
+        )
+
+    transport = httpx.MockTransport(handler)
+    http = httpx.AsyncClient(transport=transport)
+    client = LinearClient("t", api_url="https://linear.test/graphql", http=http)
+    try:
+        async with anyio.create_task_group() as tg:
+            client.start_activity_worker(tg)
+            queued = await client.create_agent_activity(
+                session_id="s1",
+                content={"type": "thought", "body": "first"},
+                async_mode=True,
+            )
+            assert queued == {}
+            activity = await client.create_agent_activity(
+                session_id="s1", content={"type": "response", "body": "second"}
+            )
+            assert activity["id"] == "a2"
+            await client.aclose()
+        assert bodies == ["first", "second"]
+    finally:
+        await http.aclose()
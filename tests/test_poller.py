@@ -1,8 +1,16 @@
 from __future__ import annotations
 
+import functools
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import anyio
 import pytest
 
+from takopi_linear.backend import _run_loop
 from takopi_linear.poller import GatewayPoller
+from takopi_linear.settings import LinearTransportSettings
 
 
 class _FakeCursor:
@@ -19,6 +27,10 @@ class _FakeCursor:
     async def execute(self, sql: str, params: tuple[object, ...]):
         self.executed.append((sql, params))
 
+    async def executemany(self, sql: str, params_seq: list[tuple[object, ...]]):
+        for params in params_seq:
+            self.executed.append((sql, params))
+
     async def fetchall(self):
         return self.rows
 
@@ -84,6 +96,18 @@ async def test_poller_decodes_json_payload_strings() -> None:
     assert events[0].payload["agentActivity"]["body"] == "hi"
 
 
+@pytest.mark.anyio
+async def test_poller_decodes_bytes_payloads_and_drops_invalid_ones() -> None:
+    rows = [
+        {"id": "e1", "source": "linear", "event_type": "x", "payload": b'{"a": 1}'},
+        {"id": "e2", "source": "linear", "event_type": "x", "payload": b"\xff\xfe"},
+        {"id": "e3", "source": "linear", "event_type": "x", "payload": "{not json"},
+    ]
+    poller = GatewayPoller(database_url="postgresql://example", conn=_FakeConn(rows))
+    events = await poller.poll()
+    assert [event.payload for event in events] == [{"a": 1}, {}, {}]
+
+
 @pytest.mark.anyio
 async def test_poller_marks_done_and_failed() -> None:
     conn = _FakeConn([])
@@ -91,3 +115,224 @@ async def test_poller_marks_done_and_failed() -> None:
     await poller.mark_done("e1")
     await poller.mark_failed("e2", error="boom")
     assert conn.commits == 2
+
+
+@pytest.mark.anyio
+async def test_poller_marks_batches_in_one_commit() -> None:
+    conn = _FakeConn([])
+    poller = GatewayPoller(database_url="postgresql://example", conn=conn)
+    await poller.mark_done_batch(["e1", "e2"])
+    await poller.mark_failed_batch([("e3", "boom")])
+    await poller.mark_done_batch([])
+    assert conn.commits == 2
+    assert [params for _, params in conn._cursor.executed] == [
+        ("e1",),
+        ("e2",),
+        ("boom", "e3"),
+    ]
+
+
+@pytest.mark.anyio
+async def test_poller_waits_with_sleep_without_notify_channel() -> None:
+    slept: list[float] = []
+
+    async def _sleep(seconds: float) -> None:
+        slept.append(seconds)
+
+    poller = GatewayPoller(database_url="postgresql://example", conn=_FakeConn([]), sleep=_sleep)
+    await poller.wait_for_events(5.0)
+    assert slept == [5.0]
+
+
+class _DroppedListenConn:
+    def __init__(self) -> None:
+        self.closed = False
+
+    async def notifies(self, *, timeout: float, stop_after: int):
+        raise OSError("server closed the connection unexpectedly")
+        yield
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+@pytest.mark.anyio
+async def test_poller_falls_back_to_sleep_when_listen_connection_drops() -> None:
+    slept: list[float] = []
+
+    async def _sleep(seconds: float) -> None:
+        slept.append(seconds)
+
+    poller = GatewayPoller(
+        database_url="postgresql://example",
+        conn=_FakeConn([]),
+        sleep=_sleep,
+        notify_channel="events",
+    )
+    listen_conn = _DroppedListenConn()
+    poller._listen_conn = listen_conn
+    await poller.wait_for_events(5.0)
+    assert slept == [5.0]
+    assert listen_conn.closed
+    assert poller._listen_conn is None
+
+
+@pytest.mark.anyio
+async def test_poller_buffers_acks_until_batch_size_or_close() -> None:
+    conn = _FakeConn([])
+    poller = GatewayPoller(database_url="postgresql://example", conn=conn, ack_batch_size=2)
+    await poller.ack_done("e1")
+    assert conn.commits == 0
+    await poller.ack_failed("e2", error="boom")
+    assert conn.commits == 1
+    await poller.ack_done("e3")
+    await poller.close()
+    assert conn.commits == 2
+    assert [params for _, params in conn._cursor.executed] == [("e1",), ("boom", "e2"), ("e3",)]
+
+
+class _FailingCommitConn(_FakeConn):
+    def __init__(self, rows, *, failures: int) -> None:
+        super().__init__(rows)
+        self.failures = failures
+
+    async def commit(self):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("connection lost")
+        await super().commit()
+
+    async def rollback(self):
+        return None
+
+
+@pytest.mark.anyio
+async def test_poller_keeps_acks_when_flush_fails() -> None:
+    conn = _FailingCommitConn([], failures=1)
+    poller = GatewayPoller(database_url="postgresql://example", conn=conn)
+    await poller.ack_done("e1")
+    await poller.ack_failed("e2", error="boom")
+    with pytest.raises(OSError):
+        await poller.flush()
+    await poller.ack_done("e3")
+    conn._cursor.executed.clear()
+    await poller.flush()
+    assert conn.commits == 1
+    assert [params for _, params in conn._cursor.executed] == [("e1",), ("e3",), ("boom", "e2")]
+
+
+@pytest.mark.anyio
+async def test_poller_process_batch_acks_each_event() -> None:
+    conn = _FakeConn(
+        [
+            {"id": "e1", "source": "linear", "event_type": "x", "payload": {}},
+            {"id": "e2", "source": "linear", "event_type": "x", "payload": {}},
+        ]
+    )
+    poller = GatewayPoller(database_url="postgresql://example", conn=conn)
+    events = await poller.poll()
+
+    async def handler(event) -> None:
+        if event.id == "e2":
+            raise RuntimeError("boom")
+
+    await poller.process_batch(events, handler, concurrency=2)
+    await poller.flush()
+    assert sorted(params for _, params in conn._cursor.executed[1:]) == [("boom", "e2"), ("e1",)]
+
+
+# Stand-in for collaborators the idle loop never touches.
+_UNUSED: Any = object()
+
+
+class _FlakyWaitPoller:
+    def __init__(self, scope: anyio.CancelScope, **_: Any) -> None:
+        self.scope = scope
+        self.calls: list[str] = []
+
+    async def __aenter__(self) -> _FlakyWaitPoller:
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        return None
+
+    async def flush(self) -> None:
+        return None
+
+    async def poll(self) -> list[object]:
+        self.calls.append("poll")
+        return []
+
+    async def wait_for_events(self, timeout: float) -> None:
+        self.calls.append(f"wait {timeout}")
+        if self.calls.count("poll") == 1:
+            raise OSError("connection lost")
+        self.scope.cancel()
+        await anyio.sleep_forever()
+
+    async def sleep(self, seconds: float) -> None:
+        self.calls.append(f"sleep {seconds}")
+
+
+@pytest.mark.anyio
+async def test_run_loop_retries_after_a_failed_idle_wait(
+    settings: LinearTransportSettings, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    pollers: list[_FlakyWaitPoller] = []
+    with anyio.CancelScope() as scope:
+
+        def make_poller(**kwargs: Any) -> _FlakyWaitPoller:
+            pollers.append(_FlakyWaitPoller(scope, **kwargs))
+            return pollers[-1]
+
+        monkeypatch.setattr("takopi_linear.backend.GatewayPoller", make_poller)
+        await _run_loop(
+            settings=settings,
+            runtime=_UNUSED,
+            exec_cfg=_UNUSED,
+            client=_UNUSED,
+            default_engine_override=None,
+            config_path=tmp_path / "takopi.toml",
+        )
+    assert pollers[0].calls == ["poll", "wait 5.0", "sleep 5.0", "poll", "wait 10.0"]
+
+
+class _StubPoolConn:
+    def __init__(self) -> None:
+        from psycopg.pq import TransactionStatus
+
+        self.pgconn = SimpleNamespace(transaction_status=TransactionStatus.IDLE)
+        self.closed = False
+
+    @classmethod
+    async def connect(cls, conninfo: str, **kwargs: Any) -> _StubPoolConn:
+        return cls()
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+@pytest.mark.anyio
+async def test_poller_pool_runs_configure_on_new_connections(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    psycopg_pool = pytest.importorskip("psycopg_pool")
+    configured: list[object] = []
+
+    def _set_json_loads(loads: object, context: object) -> None:
+        configured.append(context)
+
+    monkeypatch.setattr("psycopg.types.json.set_json_loads", _set_json_loads)
+    monkeypatch.setattr("takopi_linear.poller.jsonutil.orjson", object())
+    monkeypatch.setattr(
+        "takopi_linear.poller._require_psycopg_pool",
+        lambda: functools.partial(psycopg_pool.AsyncConnectionPool, connection_class=_StubPoolConn),
+    )
+    poller = GatewayPoller(database_url="postgresql://example", pool_min_size=2)
+    await poller.open()
+    try:
+        await poller._pool.wait(timeout=5.0)
+        assert len(configured) == 2
+        assert all(isinstance(conn, _StubPoolConn) for conn in configured)
+    finally:
+        await poller.close()
@@ -1,77 +1,63 @@
 from __future__ import annotations
 
+import functools
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, cast
+from typing import Any
 
+import anyio
 import pytest
 
 from takopi.runner_bridge import ExecBridgeConfig, RunningTask
-from takopi.transport import MessageRef, RenderedMessage
+from takopi.transport import MessageRef
 
 from takopi_linear.backend import _SessionState, _handle_event
 from takopi_linear.settings import LinearTransportSettings
 from takopi_linear.types import GatewayEvent
 
+from .conftest import FakeTransport
 
-class _FakeTransport:
-    def __init__(self) -> None:
-        self.sent: list[tuple[str, RenderedMessage]] = []
-
-    async def close(self) -> None:
-        return None
-
-    async def send(self, *, channel_id: str, message: RenderedMessage, options: Any | None = None):
-        _ = options
-        self.sent.append((str(channel_id), message))
-        return None
-
-    async def edit(self, *, ref: MessageRef, message: RenderedMessage, wait: bool = True):
-        _ = ref
-        _ = message
-        _ = wait
-        return None
 
-    async def delete(self, *, ref: MessageRef) -> bool:
-        _ = ref
-        return True
+# Stand-in for collaborators a test path never touches.
+_UNUSED: Any = object()
 
+# The handler only reads event payloads, so the events are built once.
+_STOP_EVENT = GatewayEvent(
+    id="e2",
+    source="linear",
+    event_type="AgentSessionEvent",
+    payload={
+        "type": "AgentSessionEvent",
+        "action": "stopped",
+        "agentSession": {"id": "sess_1"},
+    },
+)
 
-class _FakePresenter:
-    pass
+_PROMPTED_EVENT = _STOP_EVENT._replace(
+    id="e1",
+    payload={
+        "type": "AgentSessionEvent",
+        "action": "prompted",
+        "agentSession": {"id": "sess_1"},
+        "agentActivity": {"id": "act_1"},
+    },
+)
 
 
 @pytest.mark.anyio
-async def test_stop_event_requests_cancel_for_running_session() -> None:
-    transport = _FakeTransport()
-    exec_cfg = ExecBridgeConfig(transport=transport, presenter=_FakePresenter(), final_notify=False)
-    settings = LinearTransportSettings(
-        oauth_token="token",
-        app_id="app",
-        gateway_database_url="postgresql://example",
-    )
+async def test_stop_event_requests_cancel_for_running_session(
+    settings: LinearTransportSettings, exec_cfg: ExecBridgeConfig, transport: FakeTransport
+) -> None:
 
     state = _SessionState()
     running = RunningTask()
     state.running_tasks[MessageRef(channel_id="sess_1", message_id="m1")] = running
 
-    event = GatewayEvent(
-        id="e2",
-        source="linear",
-        event_type="AgentSessionEvent",
-        payload={
-            "type": "AgentSessionEvent",
-            "action": "stopped",
-            "agentSession": {"id": "sess_1"},
-        },
-        external_id=None,
-        created_at=None,
-    )
-
     await _handle_event(
-        event=event,
-        runtime=cast(Any, object()),
+        event=_STOP_EVENT,
+        runtime=_UNUSED,
         exec_cfg=exec_cfg,
-        client=cast(Any, object()),
+        client=_UNUSED,
         settings=settings,
         project_map={},
         sessions={"sess_1": state},
@@ -85,6 +71,37 @@ async def test_stop_event_requests_cancel_for_running_session() -> None:
     assert "Stop requested" in transport.sent[-1][1].text
 
 
+@pytest.mark.anyio
+async def test_stop_event_drops_session_once_its_run_finishes(
+    settings: LinearTransportSettings, exec_cfg: ExecBridgeConfig
+) -> None:
+    state = _SessionState()
+    sessions = {"sess_1": state}
+    run_lock = state.ensure_run_lock()
+    await run_lock.acquire()
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(
+            functools.partial(
+                _handle_event,
+                event=_STOP_EVENT,
+                runtime=_UNUSED,
+                exec_cfg=exec_cfg,
+                client=_UNUSED,
+                settings=settings,
+                project_map={},
+                sessions=sessions,
+                default_engine_override=None,
+            )
+        )
+        await anyio.wait_all_tasks_blocked()
+        assert state.stop_requested is True
+        assert sessions == {"sess_1": state}
+        run_lock.release()
+
+    assert sessions == {}
+
+
 class _FakeRunner:
     engine = "fake"
 
@@ -101,6 +118,24 @@ class _FakeRunner:
         return None
 
 
+_RUNNER = _FakeRunner()
+
+
+@dataclass(slots=True)
+class _Resolved:
+    prompt: str
+    engine_override: Any = None
+    resume_token: Any = None
+    context: Any = None
+
+
+@dataclass(slots=True)
+class _Entry:
+    runner: Any
+    available: bool = True
+    issue: Any = None
+
+
 class _FakeRuntime:
     def __init__(self) -> None:
         self.seen_text: str | None = None
@@ -108,18 +143,11 @@ class _FakeRuntime:
     def resolve_message(self, *, text: str, reply_text, ambient_context, chat_id):
         _ = (reply_text, ambient_context, chat_id)
         self.seen_text = text
-        return cast(
-            Any,
-            type(
-                "_Resolved",
-                (),
-                {"prompt": text, "engine_override": None, "resume_token": None, "context": None},
-            )(),
-        )
+        return _Resolved(prompt=text)
 
     def resolve_runner(self, *, resume_token, engine_override):
         _ = (resume_token, engine_override)
-        return cast(Any, type("_Entry", (), {"runner": _FakeRunner(), "available": True, "issue": None})())
+        return _Entry(runner=_RUNNER)
 
     def resolve_run_cwd(self, context):
         _ = context
@@ -144,42 +172,17 @@ class _FakeClient:
 
 
 @pytest.mark.anyio
-async def test_prompted_event_fetches_prompt_body_when_missing(monkeypatch: pytest.MonkeyPatch) -> None:
-    async def fake_handle_message(*args, **kwargs):
-        _ = (args, kwargs)
-        return None
-
-    monkeypatch.setattr("takopi_linear.backend.handle_message", fake_handle_message)
-
-    transport = _FakeTransport()
-    exec_cfg = ExecBridgeConfig(transport=transport, presenter=_FakePresenter(), final_notify=False)
-    settings = LinearTransportSettings(
-        oauth_token="token",
-        app_id="app",
-        gateway_database_url="postgresql://example",
-    )
+async def test_prompted_event_fetches_prompt_body_when_missing(
+    settings: LinearTransportSettings, exec_cfg: ExecBridgeConfig, transport: FakeTransport
+) -> None:
     client = _FakeClient()
     runtime = _FakeRuntime()
 
-    event = GatewayEvent(
-        id="e1",
-        source="linear",
-        event_type="AgentSessionEvent",
-        payload={
-            "type": "AgentSessionEvent",
-            "action": "prompted",
-            "agentSession": {"id": "sess_1"},
-            "agentActivity": {"id": "act_1"},
-        },
-        external_id=None,
-        created_at=None,
-    )
-
     await _handle_event(
-        event=event,
-        runtime=cast(Any, runtime),
+        event=_PROMPTED_EVENT,
+        runtime=runtime,  # type: ignore[arg-type]
         exec_cfg=exec_cfg,
-        client=cast(Any, client),
+        client=client,  # type: ignore[arg-type]
         settings=settings,
         project_map={},
         sessions={},
@@ -1,14 +1,19 @@
 from __future__ import annotations
 
+import pytest
+
 from takopi_linear.backend import (
     _extract_issue_project_id,
     _extract_issue_title,
     _extract_issue_title_from_prompt_context,
     _extract_prompt_body,
+    _extract_session_fields,
     _extract_session_id,
     _normalize_event_type,
+    _parse_event,
     _unwrap_payload,
 )
+from takopi_linear.types import GatewayEvent
 
 
 def test_normalizes_agent_session_event_types() -> None:
@@ -37,76 +42,77 @@ def test_extracts_agent_session_created_fields() -> None:
     assert _extract_issue_project_id(raw) == "proj_1"
 
 
-def test_extracts_prompted_body_from_agent_activity() -> None:
-    payload = {
-        "type": "AgentSessionEvent",
-        "action": "prompted",
-        "agentSession": {"id": "sess_1"},
-        "agentActivity": {"body": "please continue"},
-    }
-    raw = _unwrap_payload(payload)
-    assert _extract_session_id(raw) == "sess_1"
-    assert _extract_prompt_body(raw) == "please continue"
-
-
-def test_extracts_prompted_body_from_agent_activity_content_body() -> None:
-    payload = {
-        "type": "AgentSessionEvent",
-        "action": "prompted",
-        "data": {
-            "agentSession": {"id": "sess_1"},
-            "agentActivity": {"content": {"type": "message", "body": "hello from content"}},
-        },
-    }
+_PROMPTED = {"type": "AgentSessionEvent", "action": "prompted"}
+
+
+@pytest.mark.parametrize(
+    ("payload", "expected"),
+    [
+        pytest.param(
+            {**_PROMPTED, "agentSession": {"id": "sess_1"}, "agentActivity": {"body": "please continue"}},
+            "please continue",
+            id="activity-body",
+        ),
+        pytest.param(
+            {
+                **_PROMPTED,
+                "data": {
+                    "agentSession": {"id": "sess_1"},
+                    "agentActivity": {"content": {"type": "message", "body": "hello from content"}},
+                },
+            },
+            "hello from content",
+            id="content-body",
+        ),
+        pytest.param(
+            {
+                **_PROMPTED,
+                "agentSession": {"id": "sess_1"},
+                "agentActivity": {"content": {"type": "message", "message": {"body": "hello nested"}}},
+            },
+            "hello nested",
+            id="content-nested-message-body",
+        ),
+        pytest.param(
+            {
+                **_PROMPTED,
+                "agentSession": {"id": "sess_1"},
+                "agentActivity": {"content": '{"type":"message","message":{"body":"hello json"}}'},
+            },
+            "hello json",
+            id="content-json-string",
+        ),
+        pytest.param(
+            {
+                **_PROMPTED,
+                "agentSession": {"id": "sess_1"},
+                "agentActivity": {
+                    "content": {"type": "action", "action": "message", "parameter": "hello param"}
+                },
+            },
+            "hello param",
+            id="content-action-message-parameter",
+        ),
+        pytest.param(
+            {
+                **_PROMPTED,
+                "agentSession": {"id": "sess_1"},
+                "agentActivity": {
+                    "content": {
+                        "type": "action",
+                        "action": {"action": "message", "parameter": "hello nested param"},
+                    }
+                },
+            },
+            "hello nested param",
+            id="content-nested-action-message-parameter",
+        ),
+    ],
+)
+def test_extracts_prompted_body(payload: dict[str, object], expected: str) -> None:
     raw = _unwrap_payload(payload)
     assert _extract_session_id(raw) == "sess_1"
-    assert _extract_prompt_body(raw) == "hello from content"
-
-
-def test_extracts_prompted_body_from_agent_activity_content_nested_message_body() -> None:
-    payload = {
-        "type": "AgentSessionEvent",
-        "action": "prompted",
-        "agentSession": {"id": "sess_1"},
-        "agentActivity": {"content": {"type": "message", "message": {"body": "hello nested"}}},
-    }
-    raw = _unwrap_payload(payload)
-    assert _extract_prompt_body(raw) == "hello nested"
-
-
-def test_extracts_prompted_body_from_agent_activity_content_json_string() -> None:
-    payload = {
-        "type": "AgentSessionEvent",
-        "action": "prompted",
-        "agentSession": {"id": "sess_1"},
-        "agentActivity": {"content": '{"type":"message","message":{"body":"hello json"}}'},
-    }
-    raw = _unwrap_payload(payload)
-    assert _extract_prompt_body(raw) == "hello json"
-
-
-def test_extracts_prompted_body_from_agent_activity_content_action_message_parameter() -> None:
-    payload = {
-        "type": "AgentSessionEvent",
-        "action": "prompted",
-        "agentSession": {"id": "sess_1"},
-        "agentActivity": {"content": {"type": "action", "action": "message", "parameter": "hello param"}},
-    }
-    raw = _unwrap_payload(payload)
-    assert _extract_prompt_body(raw) == "hello param"
-
-
-def test_extracts_prompted_body_from_agent_activity_content_nested_action_message_parameter() -> None:
-    payload = {
-        "type": "AgentSessionEvent",
-        "action": "prompted",
-        "agentSession": {"id": "sess_1"},
-        "agentActivity": {
-            "content": {"type": "action", "action": {"action": "message", "parameter": "hello nested param"}}
-        },
-    }
-    raw = _unwrap_payload(payload)
-    assert _extract_prompt_body(raw) == "hello nested param"
+    assert _extract_prompt_body(raw) == expected
 
 
 def test_extracts_issue_title_from_prompt_context_title_tag() -> None:
@@ -162,3 +168,39 @@ def test_extracts_prompt_body_from_raw_payload_wrapper() -> None:
     raw = _unwrap_payload(payload)
     assert _extract_session_id(raw) == "sess_1"
     assert _extract_prompt_body(raw) == "please continue"
+
+
+def test_extracts_all_session_fields_in_one_pass() -> None:
+    payload = {
+        "type": "AgentSessionEvent",
+        "action": "prompted",
+        "agentSession": {
+            "id": "sess_1",
+            "issue": {"id": "issue_1", "title": " Fix login ", "projectId": "proj_1"},
+        },
+        "agentActivity": {"id": "act_1", "body": "please continue"},
+    }
+    fields = _extract_session_fields(_unwrap_payload(payload))
+    assert fields.session_id == "sess_1"
+    assert fields.issue_id == "issue_1"
+    assert fields.issue_title == "Fix login"
+    assert fields.project_id == "proj_1"
+    assert fields.activity_id == "act_1"
+    assert fields.prompt_body == "please continue"
+
+
+def test_parse_event_only_extracts_fields_for_handled_events() -> None:
+    base = GatewayEvent(id="e1", source="linear", event_type="", payload={})
+
+    parsed = _parse_event(
+        base._replace(
+            payload={"data": {"type": "AgentSessionEvent", "action": "created", "agentSession": {"id": "sess_1"}}}
+        )
+    )
+    assert parsed.event_type == "agent_session.created"
+    assert parsed.fields is not None
+    assert parsed.fields.session_id == "sess_1"
+
+    ignored = _parse_event(base._replace(payload={"type": "Issue", "action": "update"}))
+    assert ignored.event_type == "issue"
+    assert ignored.fields is None